@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class HabitsConfig(AppConfig):
+    name = "app"
+
+    def ready(self):
+        # Connect the signal receivers that invalidate cached users
+        from . import authentication  # noqa: F401
@@ -0,0 +1,319 @@
+"""
+Async versions of the I/O-bound analytics endpoints, for ASGI deployments.
+
+Under an ASGI server a sync view occupies a worker thread for its whole
+run, so a few long-range exports or graphs can hold every thread while
+quick requests such as habits/<id>/complete/ queue behind them. These views
+await their queries through Django's async ORM instead, and export_csv
+streams from an async iterator.
+
+urls.py routes the analytics paths here ahead of the DRF viewsets when
+settings.ASYNC_ANALYTICS is set. Responses, caching and authentication
+match the viewset actions: the same builder methods are reused through a
+viewset instance, and raw SQL helpers without an async API (streaks,
+rollup buckets, keyset pages) run via sync_to_async.
+"""
+
+import csv
+from collections import defaultdict
+from datetime import datetime
+from functools import wraps
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.db.models import Max, Min
+from django.http import StreamingHttpResponse
+from django.views.decorators.http import require_safe
+from rest_framework.exceptions import (
+    APIException,
+    AuthenticationFailed,
+    NotAuthenticated,
+)
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .models import Completion, UserDataState
+from .response_cache import async_cached_response
+from .views import (
+    EXPORT_CHUNK_SIZE,
+    GRANULARITIES,
+    HabitCorrelationViewSet,
+    HabitViewSet,
+    _Echo,
+)
+
+
+def analytics_view(view):
+    """
+    Authenticate the request like the DRF viewsets (default authentication
+    classes and IsAuthenticated), pass it on as a DRF Request and render the
+    returned Response as JSON
+    """
+
+    @require_safe
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        request = Request(
+            request,
+            authenticators=[
+                authentication()
+                for authentication in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+            ],
+        )
+        try:
+            # Authenticators read the user with the sync ORM
+            user = await sync_to_async(lambda: request.user)()
+            if not user.is_authenticated:
+                raise NotAuthenticated()
+            response = await view(request, *args, **kwargs)
+        except APIException as exc:
+            # Same body as DRF's default exception handler
+            data = exc.detail if isinstance(exc.detail, (list, dict)) else None
+            response = Response(data or {"detail": exc.detail}, status=exc.status_code)
+            if isinstance(exc, (AuthenticationFailed, NotAuthenticated)):
+                authenticator = request.authenticators[0]
+                response.status_code = 401
+                response["WWW-Authenticate"] = authenticator.authenticate_header(
+                    request
+                )
+
+        if isinstance(response, Response):
+            response.accepted_renderer = JSONRenderer()
+            response.accepted_media_type = JSONRenderer.media_type
+            response.renderer_context = {"request": request, "response": response}
+            response.render()
+        return response
+
+    return wrapper
+
+
+def _viewset(viewset_class, request, action):
+    """A viewset instance for reusing its query and response builders"""
+    return viewset_class(
+        request=request, format_kwarg=None, args=(), kwargs={}, action=action
+    )
+
+
+def _parse_date_range(request):
+    """Return (start_date, end_date) from the query params, or an error Response"""
+    start_date_str = request.query_params.get("start_date")
+    end_date_str = request.query_params.get("end_date")
+
+    if not start_date_str or not end_date_str:
+        return Response({"error": "start_date and end_date are required"}, status=400)
+
+    try:
+        start_date = datetime.strptime(start_date_str, "%Y-%m-%d").date()
+        end_date = datetime.strptime(end_date_str, "%Y-%m-%d").date()
+    except ValueError:
+        return Response({"error": "Invalid date format. Use YYYY-MM-DD"}, status=400)
+    return start_date, end_date
+
+
+def _parse_granularity(request):
+    granularity = request.query_params.get("granularity", "day")
+    if granularity not in GRANULARITIES:
+        return Response(
+            {"error": "granularity must be one of: day, week, month"}, status=400
+        )
+    return granularity
+
+
+@analytics_view
+@async_cached_response("habits.graph_data")
+async def graph_data(request):
+    """Async HabitViewSet.graph_data"""
+    dates = _parse_date_range(request)
+    if isinstance(dates, Response):
+        return dates
+    start_date, end_date = dates
+    granularity = _parse_granularity(request)
+    if isinstance(granularity, Response):
+        return granularity
+
+    viewset = _viewset(HabitViewSet, request, "graph_data")
+    habits = [habit async for habit in viewset._get_user_habits()]
+
+    if granularity != "day":
+        result = await sync_to_async(viewset._build_bucketed_graph_data)(
+            habits, start_date, end_date, granularity
+        )
+        result["granularity"] = granularity
+        return Response(result)
+
+    completions = (
+        Completion.objects.filter(
+            user=request.user,
+            habit__in=[habit.id for habit in habits],
+            date__gte=start_date,
+            date__lte=end_date,
+        )
+        .order_by("habit_id", "date")
+        .values_list("habit_id", "date", "value")
+    )
+    points_by_habit = defaultdict(list)
+    async for habit_id, completion_date, value in completions:
+        points_by_habit[habit_id].append((completion_date, float(value)))
+
+    return Response(viewset._build_graph_data(habits, points_by_habit))
+
+
+@analytics_view
+@async_cached_response("habits.summary")
+async def summary(request):
+    """Async HabitViewSet.summary"""
+    dates = _parse_date_range(request)
+    if isinstance(dates, Response):
+        return dates
+    start_date, end_date = dates
+    granularity = _parse_granularity(request)
+    if isinstance(granularity, Response):
+        return granularity
+
+    viewset = _viewset(HabitViewSet, request, "summary")
+    habits = [
+        habit
+        async for habit in viewset._get_user_habits()
+        .select_related("category")
+        .prefetch_related("tags")
+    ]
+    days_in_range = (end_date - start_date).days + 1
+
+    if granularity != "day":
+        buckets_by_habit = await sync_to_async(viewset._bucket_stats)(
+            habits, start_date, end_date, granularity
+        )
+        stats_by_habit = {
+            habit_id: viewset._merge_buckets(buckets.values())
+            for habit_id, buckets in buckets_by_habit.items()
+        }
+    else:
+        stats_by_habit = {
+            row["habit_id"]: row
+            async for row in viewset._daily_stats_queryset(habits, start_date, end_date)
+        }
+
+    streaks = await sync_to_async(viewset._calculate_streaks)(
+        [habit for habit in habits if habit.habit_type == "boolean"],
+        start_date,
+        end_date,
+    )
+
+    return Response(
+        viewset._build_summary(habits, stats_by_habit, streaks, days_in_range)
+    )
+
+
+@analytics_view
+@async_cached_response("habits.date_range")
+async def date_range(request):
+    """Async HabitViewSet.date_range"""
+    params = request.query_params
+    if "include_archived" in params or "archived_only" in params:
+        viewset = _viewset(HabitViewSet, request, "date_range")
+        bounds = await Completion.objects.filter(
+            user=request.user, habit__in=viewset._get_user_habits()
+        ).aaggregate(min_date=Min("date"), max_date=Max("date"))
+        min_date, max_date = bounds["min_date"], bounds["max_date"]
+    else:
+        min_date, max_date = await UserDataState.aget_completion_bounds(request.user)
+
+    if min_date is None:
+        return Response(
+            {"start_date": None, "end_date": None, "message": "No data available"}
+        )
+
+    return Response(
+        {"start_date": min_date.isoformat(), "end_date": max_date.isoformat()}
+    )
+
+
+@analytics_view
+@async_cached_response("habits.export_csv")
+async def export_csv(request):
+    """Async HabitViewSet.export_csv"""
+    dates = _parse_date_range(request)
+    if isinstance(dates, Response):
+        return dates
+    start_date, end_date = dates
+
+    viewset = _viewset(HabitViewSet, request, "export_csv")
+    rows = _iter_csv_rows(viewset, start_date, end_date)
+
+    if request.query_params.get("stream", "false").lower() == "true":
+        writer = csv.writer(_Echo())
+        response = StreamingHttpResponse(
+            (writer.writerow(row) async for row in rows), content_type="text/csv"
+        )
+        params = request.query_params
+        response["Content-Disposition"] = (
+            "attachment; "
+            f'filename="habit_data_{params["start_date"]}_to_{params["end_date"]}.csv"'
+        )
+        return response
+
+    output = []
+    writer = csv.writer(_Echo())
+    async for row in rows:
+        output.append(writer.writerow(row))
+    return Response({"csv_content": "".join(output)})
+
+
+async def _iter_csv_rows(viewset, start_date, end_date):
+    """Async HabitViewSet._iter_csv_rows"""
+    habits = [
+        habit async for habit in viewset._get_user_habits().order_by("name", "id")
+    ]
+    num_days = (end_date - start_date).days + 1
+
+    yield viewset._csv_header(start_date, num_days)
+
+    # Read a chunk at a time in the request's sync thread, as aiterator()
+    # does; aiterator() itself runs a values_list() query in the event loop
+    completions = viewset._export_completions(habits, start_date, end_date).iterator(
+        chunk_size=EXPORT_CHUNK_SIZE
+    )
+    fetch_chunk = sync_to_async(lambda: list(islice(completions, EXPORT_CHUNK_SIZE)))
+    chunk, index = await fetch_chunk(), 0
+
+    for habit in habits:
+        row = [habit.name] + [""] * num_days
+        while chunk:
+            if index == len(chunk):
+                chunk, index = await fetch_chunk(), 0
+                continue
+            habit_id, completion_date, value = chunk[index]
+            if habit_id != habit.id:
+                break
+            row[(completion_date - start_date).days + 1] = float(value)
+            index += 1
+        yield row
+
+
+@analytics_view
+@async_cached_response("correlations.list")
+async def correlation_list(request):
+    """Async HabitCorrelationViewSet.list"""
+    viewset = _viewset(HabitCorrelationViewSet, request, "list")
+    limit, min_correlation = viewset._list_params(request)
+    queryset = viewset.get_queryset().filter(max_correlation__gte=min_correlation)
+
+    # Keyset pages are fetched by the sync paginator
+    page = await sync_to_async(viewset.paginate_queryset)(queryset)
+    if page is not None:
+        return viewset.get_paginated_response(
+            viewset.get_serializer(page, many=True).data
+        )
+
+    correlations = [correlation async for correlation in queryset[:limit]]
+    data = viewset.get_serializer(correlations, many=True).data
+
+    return Response(
+        {
+            "insights": data,
+            "count": len(data),
+            "filters": {"min_correlation": min_correlation, "limit": limit},
+        }
+    )
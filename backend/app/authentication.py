@@ -0,0 +1,83 @@
+"""
+JWT authentication with a per-worker user cache.
+
+rest_framework_simplejwt's JWTAuthentication loads the user row on every
+request after verifying the token. CachedJWTAuthentication keeps the
+loaded users for JWT_USER_CACHE_TTL seconds per process. A per-user
+version stamp in the shared cache is bumped whenever the user row is saved
+or deleted (deactivation, password change, ...), so every worker drops its
+copy on the next request.
+
+The stamps only reach other workers through a cache shared between
+processes (Redis, Memcached, the database). With a process-local backend
+such as the default LocMemCache, users are loaded on every request as
+with JWTAuthentication.
+"""
+
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+# Per-process users: {user_id: (user, version stamp, monotonic expiry)}
+_users = {}
+# Bound on _users; the whole map is dropped when it is exceeded
+MAX_CACHED_USERS = 10000
+
+# Cache backends whose contents other processes cannot see
+PROCESS_LOCAL_CACHE_BACKENDS = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+}
+
+
+def _stamp_key(user_id):
+    return f"auth-user:{user_id}:version"
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def invalidate_cached_user(sender, instance, **kwargs):
+    _users.pop(instance.pk, None)
+    cache.set(_stamp_key(instance.pk), uuid.uuid4().hex, None)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that reuses recently loaded users"""
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None or not self._stamps_shared():
+            return super().get_user(validated_token)
+
+        stamp = cache.get(_stamp_key(user_id))
+        entry = _users.get(user_id)
+        if entry and entry[1] == stamp and time.monotonic() < entry[2]:
+            user = entry[0]
+            # The token may still predate a password change made elsewhere
+            if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM
+            ) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+            return user
+
+        user = super().get_user(validated_token)
+        if len(_users) >= MAX_CACHED_USERS:
+            _users.clear()
+        _users[user_id] = (user, stamp, time.monotonic() + settings.JWT_USER_CACHE_TTL)
+        return user
+
+    def _stamps_shared(self):
+        """Whether invalidation stamps reach the other worker processes"""
+        return settings.CACHES["default"]["BACKEND"] not in PROCESS_LOCAL_CACHE_BACKENDS
@@ -0,0 +1,38 @@
+"""
+Report hit, miss and 304 counts of the per-user analytics response cache
+and conditional GET endpoints.
+
+Usage:
+    python manage.py analytics_cache_stats
+"""
+
+from django.core.management.base import BaseCommand
+
+from ...response_cache import cache_stats
+
+
+class Command(BaseCommand):
+    help = "Show hit/miss/304 counters of the analytics response cache"
+
+    def handle(self, *args, **options):
+        # Importing the views registers the cached endpoints
+        from ... import views  # noqa: F401
+
+        totals = {"hits": 0, "misses": 0, "not_modified": 0}
+        for endpoint, counts in sorted(cache_stats().items()):
+            for outcome, count in counts.items():
+                totals[outcome] += count
+            self.stdout.write(f"  {endpoint}: {self.describe(counts)}")
+
+        self.stdout.write(self.style.SUCCESS(f"✓ Overall: {self.describe(totals)}"))
+
+    def describe(self, counts):
+        """Format counts, with the share of requests served without recomputing"""
+        hits, misses, not_modified = (
+            counts["hits"],
+            counts["misses"],
+            counts["not_modified"],
+        )
+        requests = hits + misses + not_modified
+        ratio = f"{(hits + not_modified) / requests:.1%}" if requests else "-"
+        return f"{hits} hits, {not_modified} not modified, {misses} misses ({ratio})"
@@ -0,0 +1,96 @@
+"""
+Management command to compare queries and latency per request between
+simplejwt's JWTAuthentication and CachedJWTAuthentication.
+
+Requests are dispatched in process with a real access token for the given
+user; nothing is written except what the endpoints themselves write.
+
+Usage:
+    python manage.py benchmark_auth --user-id 1
+    python manage.py benchmark_auth --user-id 1 --requests 500 --path /api/tags/
+"""
+
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from ...authentication import CachedJWTAuthentication
+
+DEFAULT_PATHS = ["/api/auth/user/", "/api/categories/", "/api/habits/"]
+
+
+class Command(BaseCommand):
+    help = "Benchmark queries per request with and without the cached JWT user lookup"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user-id", type=int, required=True, help="User to authenticate as"
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=200,
+            help="Requests per endpoint and authentication class (default: 200)",
+        )
+        parser.add_argument(
+            "--path",
+            action="append",
+            dest="paths",
+            help="Endpoint to request (repeatable, default: a few read endpoints)",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(id=options["user_id"])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['user_id']} not found")
+
+        if not CachedJWTAuthentication()._stamps_shared():
+            self.stdout.write(
+                self.style.WARNING(
+                    "The default cache is process-local, so CachedJWTAuthentication "
+                    "loads the user on every request; set CACHE_BACKEND to compare"
+                )
+            )
+
+        token = str(AccessToken.for_user(user))
+        factory = APIRequestFactory()
+
+        for path in options["paths"] or DEFAULT_PATHS:
+            view = resolve(path).func
+            self.stdout.write(f"{path}")
+            for auth_class in (JWTAuthentication, CachedJWTAuthentication):
+                queries, seconds = self.run(
+                    view, factory, path, token, auth_class, options["requests"]
+                )
+                self.stdout.write(
+                    f"  {auth_class.__name__}: "
+                    f"{queries / options['requests']:.2f} queries/request, "
+                    f"{seconds / options['requests'] * 1000:.2f} ms/request"
+                )
+
+    def run(self, view, factory, path, token, auth_class, requests):
+        """Return (total queries, total seconds) for requests calls to view"""
+        view_class = view.cls
+        original = view_class.authentication_classes
+        view_class.authentication_classes = [auth_class]
+        try:
+            # Warm up per-worker caches so the loop measures steady state
+            view(factory.get(path, HTTP_AUTHORIZATION=f"Bearer {token}"))
+            started = time.perf_counter()
+            with CaptureQueriesContext(connection) as context:
+                for _ in range(requests):
+                    response = view(
+                        factory.get(path, HTTP_AUTHORIZATION=f"Bearer {token}")
+                    )
+                    response.render()
+            return len(context.captured_queries), time.perf_counter() - started
+        finally:
+            view_class.authentication_classes = original
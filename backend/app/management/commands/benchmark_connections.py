@@ -0,0 +1,83 @@
+"""
+Management command to measure per-request latency on PostgreSQL with
+connections closed after each request, kept persistent, or pooled.
+
+Each simulated request goes through Django's request_started and
+request_finished signals (which open, reuse or release the connection
+according to the settings under test) and runs one small query.
+
+Usage:
+    python manage.py benchmark_connections
+    python manage.py benchmark_connections --requests 1000
+"""
+
+import time
+from statistics import median, quantiles
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import request_finished, request_started
+from django.db import connections
+
+MODES = {
+    "connect per request": {"CONN_MAX_AGE": 0},
+    "persistent": {"CONN_MAX_AGE": 60, "CONN_HEALTH_CHECKS": True},
+    "pooled": {
+        "CONN_MAX_AGE": 0,
+        "OPTIONS": {"pool": {"min_size": 1, "max_size": 1}},
+    },
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark request latency with per-request, persistent and pooled connections"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=500,
+            help="Simulated requests per mode (default: 500)",
+        )
+
+    def handle(self, *args, **options):
+        default = connections.settings["default"]
+        if default["ENGINE"] != "django.db.backends.postgresql":
+            raise CommandError("benchmark_connections needs a PostgreSQL database")
+
+        for mode, overrides in MODES.items():
+            alias = f"benchmark_{len(connections.settings)}"
+            options_ = {**default.get("OPTIONS", {}), **overrides.get("OPTIONS", {})}
+            connections.settings[alias] = {
+                **default,
+                **overrides,
+                "OPTIONS": options_,
+            }
+            try:
+                latencies = self.run(connections[alias], options["requests"])
+            finally:
+                connection = connections[alias]
+                connection.close()
+                if hasattr(connection, "close_pool"):
+                    connection.close_pool()
+                del connections[alias]
+                del connections.settings[alias]
+
+            p95 = quantiles(latencies, n=20)[-1]
+            self.stdout.write(
+                f"  {mode}: p50 {median(latencies):.2f} ms, p95 {p95:.2f} ms"
+            )
+
+    def run(self, connection, requests):
+        """Return per-request latencies in milliseconds"""
+        latencies = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            request_started.send(sender=self.__class__)
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            request_finished.send(sender=self.__class__)
+            latencies.append((time.perf_counter() - started) * 1000)
+        return latencies
@@ -0,0 +1,142 @@
+"""
+Management command to compare the per-day streak loop that summary used
+to run for each boolean habit with HabitViewSet._calculate_streaks, and
+to check that both report the same longest streaks.
+
+Without --user-id a throwaway synthetic user is generated (see
+generate_synthetic_data) and deleted afterwards.
+
+Usage:
+    python manage.py benchmark_streaks
+    python manage.py benchmark_streaks --habits 30 --days 365
+    python manage.py benchmark_streaks --user-id 1 --days 90
+"""
+
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from ...models import Completion
+from ...views import HabitViewSet
+from .generate_synthetic_data import USERNAME_PREFIX, generate_user
+
+
+def legacy_streak(habit, start_date, end_date):
+    """The former HabitViewSet._calculate_streak: one query per day"""
+    current_date = start_date
+    streak = 0
+    max_streak = 0
+    while True:
+        completion = Completion.objects.filter(
+            habit=habit, date=current_date, value=1
+        ).first()
+
+        if completion:
+            streak += 1
+            max_streak = max(max_streak, streak)
+        else:
+            streak = 0
+
+        current_date = current_date + timedelta(days=1)
+        if current_date > end_date:
+            break
+
+    return max_streak
+
+
+class Command(BaseCommand):
+    help = "Benchmark boolean streaks: per-day loop against the one-pass query"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user-id",
+            type=int,
+            help="Use this user's habits instead of a synthetic user",
+        )
+        parser.add_argument(
+            "--habits",
+            type=int,
+            default=10,
+            help="Boolean habits of the synthetic user (default: 10)",
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=365,
+            help="Days in the range, ending today (default: 365)",
+        )
+        parser.add_argument(
+            "--seed", type=int, default=0, help="Random seed (default: 0)"
+        )
+
+    def handle(self, *args, **options):
+        end_date = timezone.now().date()
+        start_date = end_date - timedelta(days=options["days"] - 1)
+
+        if options["user_id"]:
+            try:
+                user = User.objects.get(id=options["user_id"])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['user_id']} not found")
+            self.run(user, start_date, end_date)
+            return
+
+        username = f"{USERNAME_PREFIX}benchmark_streaks"
+        User.objects.filter(username=username).delete()
+        # generate_user creates as many habits of every other type
+        user, _ = generate_user(
+            username, options["habits"], options["days"], random.Random(options["seed"])
+        )
+        try:
+            self.run(user, start_date, end_date)
+        finally:
+            user.delete()
+
+    def run(self, user, start_date, end_date):
+        habits = list(user.habits.filter(habit_type="boolean").order_by("id"))
+        if not habits:
+            raise CommandError(f"User {user.id} has no boolean habits")
+        self.stdout.write(
+            f"{len(habits)} boolean habits, {start_date} to {end_date} "
+            f"({connection.vendor})"
+        )
+
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            legacy = {
+                habit.id: legacy_streak(habit, start_date, end_date) for habit in habits
+            }
+            legacy_seconds = time.perf_counter() - started
+        legacy_queries = len(context.captured_queries)
+
+        # _calculate_streaks scopes its query to the requesting user
+        request = APIRequestFactory().get("/api/habits/summary/")
+        request.user = user
+        viewset = HabitViewSet(request=request)
+
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            streaks = viewset._calculate_streaks(habits, start_date, end_date)
+            seconds = time.perf_counter() - started
+        queries = len(context.captured_queries)
+
+        self.stdout.write(
+            f"  per-day loop: {legacy_queries} queries, {legacy_seconds * 1000:.1f} ms"
+        )
+        self.stdout.write(
+            f"  _calculate_streaks: {queries} queries, {seconds * 1000:.1f} ms"
+        )
+
+        mismatches = [
+            habit.name for habit in habits if legacy[habit.id] != streaks[habit.id][0]
+        ]
+        if mismatches:
+            raise CommandError(f"Longest streaks differ for: {', '.join(mismatches)}")
+        self.stdout.write(self.style.SUCCESS("✓ Longest streaks match"))
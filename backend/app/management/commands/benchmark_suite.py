@@ -0,0 +1,290 @@
+"""
+Management command to benchmark the analytics endpoints and the
+correlation job on synthetic data, and to compare runs against a saved
+baseline.
+
+For each scale a throwaway user is generated with generate_synthetic_data,
+then compute_correlations (--full) is timed for that user and every
+endpoint is requested in process with a real access token. The response cache is
+bypassed by bumping the user's cache version before each request, so the
+figures are for cold requests. The user is deleted afterwards.
+
+Scales (habits per habit type, days):
+    small: 1, 90    medium: 3, 365    large: 6, 1095
+
+Usage:
+    python manage.py benchmark_suite
+    python manage.py benchmark_suite --scale large --repeat 10
+    python manage.py benchmark_suite --output baseline.json
+    python manage.py benchmark_suite --compare baseline.json --threshold 15
+"""
+
+import json
+import random
+import statistics
+import time
+from datetime import timedelta
+from io import StringIO
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from ...models import UserDataState
+from .generate_synthetic_data import HABIT_STYLES, USERNAME_PREFIX, generate_user
+
+SCALES = {
+    "small": (1, 90),
+    "medium": (3, 365),
+    "large": (6, 1095),
+}
+
+JOB = "compute_correlations"
+
+
+class Command(BaseCommand):
+    help = "Benchmark analytics endpoints and compute_correlations on synthetic data"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scale",
+            action="append",
+            dest="scales",
+            choices=SCALES,
+            help="Scale to run (repeatable, default: small and medium)",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Timed runs per endpoint and of the job (default: 5)",
+        )
+        parser.add_argument(
+            "--seed", type=int, default=0, help="Random seed (default: 0)"
+        )
+        parser.add_argument("--output", help="Write the results to this JSON file")
+        parser.add_argument(
+            "--compare", help="Compare the results with this JSON baseline"
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=20,
+            help="Report median time increases above this percentage (default: 20)",
+        )
+        parser.add_argument(
+            "--fail-on-regression",
+            action="store_true",
+            help="Exit with an error if --compare finds a regression",
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options["compare"]:
+            try:
+                with open(options["compare"]) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read baseline {options['compare']}: {e}")
+
+        results = {
+            "created_at": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "repeat": options["repeat"],
+            "scales": {},
+        }
+        for scale in options["scales"] or ["small", "medium"]:
+            results["scales"][scale] = self.run_scale(
+                scale, options["repeat"], options["seed"]
+            )
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"✓ Wrote {options['output']}"))
+
+        if baseline is not None:
+            regressions = self.compare(baseline, results, options["threshold"])
+            if regressions and options["fail_on_regression"]:
+                raise CommandError(f"{regressions} regressions against the baseline")
+
+    def run_scale(self, scale, repeat, seed):
+        habits_per_type, days = SCALES[scale]
+        username = f"{USERNAME_PREFIX}benchmark_{scale}"
+        # Left behind by an interrupted run
+        User.objects.filter(username=username).delete()
+        user, completions = generate_user(
+            username, habits_per_type, days, random.Random(seed)
+        )
+        self.stdout.write(
+            f"{scale}: {habits_per_type * len(HABIT_STYLES)} habits, "
+            f"{days} days, {completions} completions"
+        )
+
+        try:
+            timings = {JOB: self.time_job(user, days, repeat)}
+            self.report(JOB, timings[JOB])
+
+            for name, path, params in self._endpoints(user, days):
+                timings[name] = self.time_endpoint(user, path, params, repeat)
+                self.report(name, timings[name])
+        finally:
+            user.delete()
+
+        return {
+            "habits": habits_per_type * len(HABIT_STYLES),
+            "days": days,
+            "completions": completions,
+            "timings": timings,
+        }
+
+    def _endpoints(self, user, days):
+        """(name, path, query params) of the endpoints to benchmark"""
+        end_date = timezone.now().date()
+        full_range = {
+            "start_date": (end_date - timedelta(days=days - 1)).isoformat(),
+            "end_date": end_date.isoformat(),
+        }
+        last_month = {
+            "start_date": (end_date - timedelta(days=29)).isoformat(),
+            "end_date": end_date.isoformat(),
+        }
+        first_habit = user.habits.order_by("id").first()
+        return [
+            ("habits.list", "/api/habits/", {}),
+            ("habits.date_range", "/api/habits/date_range/", {}),
+            ("habits.graph_data", "/api/habits/graph_data/", full_range),
+            (
+                "habits.graph_data.week",
+                "/api/habits/graph_data/",
+                {**full_range, "granularity": "week"},
+            ),
+            ("habits.summary", "/api/habits/summary/", last_month),
+            ("habits.summary.full", "/api/habits/summary/", full_range),
+            (
+                "habits.summary.month",
+                "/api/habits/summary/",
+                {**full_range, "granularity": "month"},
+            ),
+            ("habits.export_csv", "/api/habits/export_csv/", full_range),
+            ("correlations.list", "/api/correlations/", {}),
+            ("correlations.summary", "/api/correlations/summary/", {}),
+            (
+                "correlations.for_habit",
+                f"/api/correlations/for-habit/{first_habit.id}/",
+                {},
+            ),
+        ]
+
+    def time_job(self, user, days, repeat):
+        """Time repeat full compute_correlations runs for user"""
+
+        def run():
+            call_command(JOB, user_id=user.id, days=days, full=True, stdout=StringIO())
+
+        # Warm up imports and module level caches
+        run()
+
+        seconds = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                run()
+                seconds.append(time.perf_counter() - started)
+        return self._timing(len(context.captured_queries), seconds)
+
+    def time_endpoint(self, user, path, params, repeat):
+        """Time repeat cold GET requests of path as user"""
+        view = resolve(path).func
+        if iscoroutinefunction(view):
+            view = async_to_sync(view)
+        factory = APIRequestFactory()
+        authorization = f"Bearer {AccessToken.for_user(user)}"
+
+        def request():
+            response = view(
+                factory.get(path, params, HTTP_AUTHORIZATION=authorization),
+                **resolve(path).kwargs,
+            )
+            if response.status_code != 200:
+                raise CommandError(f"{path} returned {response.status_code}")
+            if response.streaming:
+                for _ in response.streaming_content:
+                    pass
+            elif hasattr(response, "render"):
+                response.render()
+
+        # Warm up per-worker caches (authenticated user, site settings)
+        request()
+
+        seconds = []
+        for _ in range(repeat):
+            UserDataState.record_cache_change(user.id)
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                request()
+                seconds.append(time.perf_counter() - started)
+        return self._timing(len(context.captured_queries), seconds)
+
+    def _timing(self, queries, seconds):
+        return {
+            "queries": queries,
+            "median_ms": round(statistics.median(seconds) * 1000, 3),
+            "min_ms": round(min(seconds) * 1000, 3),
+        }
+
+    def report(self, name, timing):
+        self.stdout.write(
+            f"  {name}: {timing['queries']} queries, "
+            f"{timing['median_ms']:.2f} ms median, {timing['min_ms']:.2f} ms min"
+        )
+
+    def compare(self, baseline, results, threshold):
+        """Print the changes against baseline; return the number of regressions"""
+        self.stdout.write(f"Compared with the baseline of {baseline['created_at']}")
+        regressions = 0
+        for scale, result in results["scales"].items():
+            old_scale = baseline["scales"].get(scale)
+            if old_scale is None:
+                self.stdout.write(f"{scale}: not in the baseline")
+                continue
+            if old_scale["completions"] != result["completions"]:
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"{scale}: baseline has {old_scale['completions']} "
+                        f"completions, this run {result['completions']}"
+                    )
+                )
+
+            self.stdout.write(scale)
+            for name, new in result["timings"].items():
+                old = old_scale["timings"].get(name)
+                if old is None:
+                    self.stdout.write(f"  {name}: new")
+                    continue
+                change = (new["median_ms"] / max(old["median_ms"], 0.001) - 1) * 100
+                line = (
+                    f"  {name}: {old['queries']} -> {new['queries']} queries, "
+                    f"{old['median_ms']:.2f} -> {new['median_ms']:.2f} ms "
+                    f"({change:+.0f}%)"
+                )
+                if new["queries"] > old["queries"] or change > threshold:
+                    regressions += 1
+                    self.stdout.write(self.style.ERROR(f"{line} REGRESSION"))
+                elif change < -threshold:
+                    self.stdout.write(self.style.SUCCESS(line))
+                else:
+                    self.stdout.write(line)
+
+        if regressions:
+            self.stdout.write(self.style.ERROR(f"✗ {regressions} regressions"))
+        else:
+            self.stdout.write(self.style.SUCCESS("✓ No regressions"))
+        return regressions
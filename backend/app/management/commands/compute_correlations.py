@@ -6,24 +6,265 @@ Usage:
     python manage.py compute_correlations
     python manage.py compute_correlations --days 7
     python manage.py compute_correlations --user-id 1
+    python manage.py compute_correlations --workers 4
+    python manage.py compute_correlations --full
+    python manage.py compute_correlations --rolling
+
+Users whose completions and habits have not changed since the last run,
+and whose analysis window gained or lost no completions, are skipped.
+Pass --full after changing --days or --min-sample-size.
+
+With --rolling, Pearson coefficients are updated from stored sufficient
+statistics by adding the newest days and subtracting the ones leaving the
+window. Spearman coefficients and DTW distances need the whole window, so
+rolled rows have them cleared and are ranked by Pearson alone; they come
+back when a user falls back to a full recompute (or with --rolling --full).
+
+With --dtw, DTW distances are computed for pairs whose DTW similarity could
+still beat their Pearson/Spearman strength and reach a moderate 0.5 (pairs
+ruled out by the LB_Keogh lower bound keep a NULL distance), within a
+per-user time budget. Distances are relative to the pair's distance with
+one habit's days shuffled, so unrelated habits get a similarity near 0.
+Pass --full the first time it is enabled.
 """
 
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
+from django.db import connections
+from django.db.models import Case, F, FloatField, Q, Value, When
+from django.db.models.functions import Cast
 from django.utils import timezone
 from datetime import timedelta
+from math import ceil
 from decimal import Decimal
-from collections import defaultdict
+from itertools import groupby
+from operator import itemgetter
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.util import Finalize
+
+import time
+
+import django
 
 import numpy as np
-from scipy.stats import spearmanr
-from ...models import Habit, Completion, HabitCorrelation
+from scipy.stats import rankdata
+from scipy.stats import t as t_distribution
+from ...models import (
+    Habit,
+    Completion,
+    CorrelationWindowStats,
+    HabitCorrelation,
+    UserDataState,
+)
 from dtaidistance import dtw
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Habits per distance_matrix_fast call, so the DTW time budget is checked often
+DTW_BLOCK_ROWS = 32
+
+# DTW is only computed for pairs it could lift to a moderate strength
+# (the default min_correlation of insights)
+DTW_MIN_SIMILARITY = 0.5
+
+# Fixed day order shuffle for DTW baselines, so reruns give the same distances
+DTW_SHUFFLE_SEED = 0
+
+# Rows fetched per round trip when streaming completions for all users
+COMPLETION_CHUNK_SIZE = 5000
+
+# (habit_ids, days, values) for a user without completions in the window
+EMPTY_COMPLETIONS = (
+    np.empty(0, dtype=np.int64),
+    np.empty(0, dtype=np.int64),
+    np.empty(0, dtype=np.float64),
+)
+
+
+def pearson_matrix(matrix):
+    """
+    Pearson coefficients for every pair of rows of a habits x dates matrix.
+    Rows with zero variance yield NaN, like np.corrcoef.
+    """
+    centered = matrix - matrix.mean(axis=1, keepdims=True)
+    covariance = centered @ centered.T
+    std = np.sqrt(np.diag(covariance))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        coefficients = covariance / np.outer(std, std)
+    return np.clip(coefficients, -1.0, 1.0)
+
+
+def spearman_matrix(matrix):
+    """
+    Spearman coefficients and two-sided p-values for every pair of rows.
+
+    Each row is ranked once (average ranks for ties) and the Pearson
+    coefficients of the ranks are tested against a t-distribution with
+    n - 2 degrees of freedom, matching scipy.stats.spearmanr.
+    """
+    coefficients = pearson_matrix(rankdata(matrix, axis=1))
+    dof = matrix.shape[1] - 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t_stat = coefficients * np.sqrt(
+            (dof / ((coefficients + 1.0) * (1.0 - coefficients))).clip(0)
+        )
+    p_values = 2 * t_distribution.sf(np.abs(t_stat), dof)
+    return coefficients, p_values
+
+
+def pearson_from_stats(day_count, sums, products):
+    """
+    Pearson coefficients for every pair of habits from sufficient
+    statistics: n, row sums (Σx) and the products matrix (Σxy, Σx² on the
+    diagonal). Habits with zero variance yield NaN.
+    """
+    covariance = products - np.outer(sums, sums) / day_count
+    variance = np.diag(covariance).copy()
+    # Cancellation leaves tiny residues for constant rows; treat them as zero
+    variance[variance <= 1e-9 * np.maximum(np.diag(products), 1.0)] = 0.0
+    std = np.sqrt(variance)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        coefficients = covariance / np.outer(std, std)
+    constant = std == 0
+    coefficients[constant[:, None] | constant[None, :]] = np.nan
+    return np.clip(coefficients, -1.0, 1.0)
+
+
+def lb_keogh_matrix(series, window):
+    """
+    LB_Keogh lower bounds of the DTW distance for every pair of rows, using
+    the same Sakoe-Chiba window semantics as dtaidistance (|i - j| < window).
+    The bound of (i, j) is the larger of LB(i vs j's envelope) and LB(j vs i's).
+    """
+    num_series = series.shape[0]
+    radius = max(window - 1, 0)
+    padding = ((0, 0), (radius, radius))
+    upper = sliding_window_view(
+        np.pad(series, padding, constant_values=-np.inf), 2 * radius + 1, axis=1
+    ).max(axis=2)
+    lower = sliding_window_view(
+        np.pad(series, padding, constant_values=np.inf), 2 * radius + 1, axis=1
+    ).min(axis=2)
+
+    bounds = np.empty((num_series, num_series))
+    for i in range(num_series):
+        above = np.clip(series[i] - upper, 0, None)
+        below = np.clip(lower - series[i], 0, None)
+        bounds[i] = np.sqrt((above**2 + below**2).sum(axis=1))
+    return np.maximum(bounds, bounds.T)
+
+
+def dtw_matrix(series, thresholds, window, time_budget):
+    """
+    DTW distances between rows of series relative to a shuffled baseline:
+    DTW(i, j) / DTW(i, j with its days shuffled), clipped to [0, 1]. Pairs
+    whose days line up no better than chance come out near 1, so
+    1 - distance is on the same scale as |r|. Computed only for pairs
+    i < j that can come in below thresholds[i, j]; NaN for every other pair.
+
+    A pair is pruned when its LB_Keogh bound reaches thresholds[i, j] times
+    the Euclidean distance from row i to the shuffled row j, which bounds
+    the baseline from above. The surviving rows are sent to dtaidistance's
+    C distance-matrix routine in blocks, early-abandoning at the largest
+    remaining limit. Blocks stop once time_budget seconds have passed.
+    """
+    num_series, length = series.shape
+    result = np.full((num_series, num_series), np.nan)
+    shuffled = series[:, np.random.default_rng(DTW_SHUFFLE_SEED).permutation(length)]
+    # DTW never exceeds the Euclidean distance (the unwarped path)
+    squared = (
+        (series**2).sum(axis=1)[:, None]
+        + (shuffled**2).sum(axis=1)[None, :]
+        - 2 * series @ shuffled.T
+    )
+    limits = thresholds * np.sqrt(squared.clip(0))
+
+    candidates = np.triu(lb_keogh_matrix(series, window) < limits, k=1)
+    rows = np.flatnonzero(candidates.any(axis=1))
+    if rows.size == 0:
+        return result
+
+    # Baselines are DTW(row i of series, row j of shuffled) in one matrix
+    stacked = np.vstack([series, shuffled])
+    deadline = time.monotonic() + time_budget
+    for block_rows in np.array_split(rows, ceil(rows.size / DTW_BLOCK_ROWS)):
+        if time.monotonic() > deadline:
+            break
+        first, last = block_rows[0], block_rows[-1] + 1
+        block_candidates = candidates[first:last]
+        distances = dtw.distance_matrix_fast(
+            series,
+            window=window,
+            max_dist=float(limits[first:last][block_candidates].max()),
+            block=((first, last), (first, num_series)),
+            compact=False,
+        )[first:last]
+        baselines = dtw.distance_matrix_fast(
+            stacked,
+            window=window,
+            block=((first, last), (num_series + first, 2 * num_series)),
+            compact=False,
+        )[first:last, num_series:]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result[first:last][block_candidates] = (distances / baselines)[
+                block_candidates
+            ]
+
+    # Early-abandoned pairs come back as inf, constant pairs as NaN
+    result[~np.isfinite(result)] = np.nan
+    return result.clip(0, 1)
+
+
+def _init_worker():
+    """
+    Process pool initializer: make sure Django is set up in the worker, and
+    close the worker's database connections once when it exits.
+    """
+    django.setup()
+    # Forked pool workers skip atexit hooks but run multiprocessing finalizers
+    Finalize(None, _close_connections, exitpriority=0)
+
+
+def _close_connections():
+    """Close this process's database connections, and pools if configured"""
+    connections.close_all()
+    for connection in connections.all(initialized_only=True):
+        if connection.settings_dict.get("OPTIONS", {}).get("pool"):
+            connection.close_pool()
+
+
+def _compute_batch(
+    user_ids, start_date, end_date, min_sample_size, full, rolling, dtw_settings
+):
+    """
+    Process pool entry point: compute correlations for a batch of users.
+    Each worker opens its own database connection (or pool) on first use
+    and keeps it for all the batches it runs.
+
+    Returns [(username, count)] in user id order, count None if skipped.
+    """
+    command = Command()
+    command.dtw_window, command.dtw_budget = dtw_settings
+    results = list(
+        command.compute_users(
+            User.objects.filter(id__in=user_ids),
+            start_date,
+            end_date,
+            min_sample_size,
+            full,
+            rolling,
+        )
+    )
+    return results
 
 
 class Command(BaseCommand):
     help = "Compute habit correlations for all users based on recent completion data"
 
+    # Sakoe-Chiba window for DTW, None when DTW is disabled
+    dtw_window = None
+    # Seconds of DTW computation allowed per user
+    dtw_budget = 10.0
+
     def add_arguments(self, parser):
         parser.add_argument(
             "--days",
@@ -42,11 +283,51 @@ class Command(BaseCommand):
             default=4,
             help="Minimum number of overlapping data points required",
         )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of worker processes to split users across (default: 1)",
+        )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Recompute every user, even if their data has not changed",
+        )
+        parser.add_argument(
+            "--rolling",
+            action="store_true",
+            help=(
+                "Slide each user's Pearson window using stored sufficient "
+                "statistics; rolled rows have no Spearman or DTW values"
+            ),
+        )
+        parser.add_argument(
+            "--dtw",
+            action="store_true",
+            help="Also compute DTW distances for pairs that can beat their correlation",
+        )
+        parser.add_argument(
+            "--dtw-window",
+            type=int,
+            default=3,
+            help="Sakoe-Chiba window for DTW, in days (default: 3)",
+        )
+        parser.add_argument(
+            "--dtw-budget",
+            type=float,
+            default=10.0,
+            help="Seconds of DTW computation allowed per user (default: 10)",
+        )
 
     def handle(self, *args, **options):
         days = options["days"]
         user_id = options.get("user_id")
         min_sample_size = options["min_sample_size"]
+        full = options["full"]
+        rolling = options["rolling"]
+        self.dtw_window = options["dtw_window"] if options["dtw"] else None
+        self.dtw_budget = options["dtw_budget"]
 
         end_date = timezone.now().date() - timedelta(days=1)
         start_date = end_date - timedelta(days=days - 1)
@@ -59,116 +340,319 @@ class Command(BaseCommand):
 
         users = User.objects.filter(id=user_id) if user_id else User.objects.all()
         total = 0
-
-        for user in users:
-            count = self.compute_user_correlations(
-                user, start_date, end_date, min_sample_size
+        skipped = 0
+
+        if options["workers"] > 1:
+            results = self.compute_in_workers(
+                users,
+                options["workers"],
+                start_date,
+                end_date,
+                min_sample_size,
+                full,
+                rolling,
+            )
+        else:
+            results = self.compute_users(
+                users, start_date, end_date, min_sample_size, full, rolling
             )
+
+        for username, count in results:
+            if count is None:
+                skipped += 1
+                self.stdout.write(f"  User {username}: unchanged, skipped")
+                continue
             total += count
-            self.stdout.write(f"  User {user.username}: {count} correlations")
+            self.stdout.write(f"  User {username}: {count} correlations")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✓ Computed {total} total correlations "
+                f"({skipped} unchanged users skipped)"
+            )
+        )
+
+    def compute_in_workers(
+        self, users, workers, start_date, end_date, min_sample_size, full, rolling
+    ):
+        """
+        Split users into batches across a process pool and yield
+        (username, count) results back in user id order.
+        """
+        user_ids = list(users.order_by("id").values_list("id", flat=True))
+        # Several batches per worker keeps the pool busy when users differ in size
+        batch_size = max(1, len(user_ids) // (workers * 4))
+        batches = [
+            user_ids[i : i + batch_size] for i in range(0, len(user_ids), batch_size)
+        ]
+
+        # Workers must not inherit the parent's open connections or pools
+        _close_connections()
+
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker
+        ) as executor:
+            futures = [
+                executor.submit(
+                    _compute_batch,
+                    batch,
+                    start_date,
+                    end_date,
+                    min_sample_size,
+                    full,
+                    rolling,
+                    (self.dtw_window, self.dtw_budget),
+                )
+                for batch in batches
+            ]
+            for future in futures:
+                yield from future.result()
+
+    def compute_users(
+        self, users, start_date, end_date, min_sample_size, full, rolling
+    ):
+        """
+        Yield (username, count) for each user in id order, count None if
+        skipped. Completions for all of the users are read in one ordered
+        pass and handed over one user block at a time.
+        """
+        blocks = self.iter_completion_blocks(users, start_date, end_date)
+        block = next(blocks, None)
+
+        for user in users.order_by("id"):
+            completions = EMPTY_COMPLETIONS
+            while block is not None and block[0] < user.id:
+                block = next(blocks, None)
+            if block is not None and block[0] == user.id:
+                completions = block[1]
+                block = next(blocks, None)
+
+            yield user.username, self.compute_changed_user_correlations(
+                user,
+                start_date,
+                end_date,
+                min_sample_size,
+                full,
+                rolling,
+                completions,
+            )
 
-        self.stdout.write(self.style.SUCCESS(f"✓ Computed {total} total correlations"))
+    def iter_completion_blocks(self, users, start_date, end_date):
+        """
+        Stream (user_id, habit_id, date, value) tuples for the users' window
+        through a server-side cursor, ordered by user, and yield
+        (user_id, (habit_ids, days, values)) arrays per user. Days are
+        proleptic ordinals; values are cast to float by the database.
+        """
+        rows = (
+            Completion.objects.filter(
+                user__in=users, date__gte=start_date, date__lte=end_date
+            )
+            .annotate(value_float=Cast("value", FloatField()))
+            .order_by("user_id")
+            .values_list("user_id", "habit_id", "date", "value_float")
+            .iterator(chunk_size=COMPLETION_CHUNK_SIZE)
+        )
+        for user_id, user_rows in groupby(rows, key=itemgetter(0)):
+            habit_ids, days, values = [], [], []
+            for _, habit_id, day, value in user_rows:
+                habit_ids.append(habit_id)
+                days.append(day.toordinal())
+                values.append(value)
+            yield user_id, (
+                np.array(habit_ids, dtype=np.int64),
+                np.array(days, dtype=np.int64),
+                np.array(values, dtype=np.float64),
+            )
 
     # -------------------------------------------------------------------------
 
-    def compute_user_correlations(self, user, start_date, end_date, min_sample_size):
+    def compute_changed_user_correlations(
+        self,
+        user,
+        start_date,
+        end_date,
+        min_sample_size,
+        full=False,
+        rolling=False,
+        completions=None,
+    ):
+        """
+        Recompute a user's correlations unless nothing feeding them changed
+        since the last run. Returns the correlation count, or None if skipped.
+        completions are the user's window arrays, if already loaded.
+        """
+        state, _ = UserDataState.objects.get_or_create(user=user)
+        # Writes during the computation bump past this version and are
+        # picked up by the next run
+        data_version = state.data_version
+
+        if not full and self.is_unchanged(user, state, start_date, end_date):
+            return None
+
+        count = None
+        if rolling and not full:
+            count = self.roll_user_correlations(
+                user, state, start_date, end_date, min_sample_size
+            )
+        if count is None:
+            count = self.compute_user_correlations(
+                user, start_date, end_date, min_sample_size, completions
+            )
+            if rolling:
+                self.rebuild_window_stats(user, start_date, end_date)
+
+        UserDataState.objects.filter(user=user).update(
+            # New correlations invalidate cached correlation responses
+            cache_version=F("cache_version") + 1,
+            correlations_version=data_version,
+            correlations_start_date=start_date,
+            correlations_end_date=end_date,
+            # Keep the dirty marker if writes arrived during this run
+            correlations_dirty_from=Case(
+                When(data_version=data_version, then=Value(None)),
+                default=F("correlations_dirty_from"),
+            ),
+        )
+        return count
+
+    def is_unchanged(self, user, state, start_date, end_date):
+        """
+        Whether the last run's correlations still hold: no writes since it
+        ran, and moving the window added or dropped no completions.
+        """
+        if (
+            state.correlations_version != state.data_version
+            or state.correlations_start_date is None
+        ):
+            return False
+
+        last_start = state.correlations_start_date
+        last_end = state.correlations_end_date
+        if (last_start, last_end) == (start_date, end_date):
+            return True
+
+        # Dates covered by exactly one of the two windows
+        in_either = Q(
+            date__gte=min(last_start, start_date), date__lte=max(last_end, end_date)
+        )
+        in_both = Q(
+            date__gte=max(last_start, start_date), date__lte=min(last_end, end_date)
+        )
+        return not Completion.objects.filter(in_either & ~in_both, user=user).exists()
+
+    def compute_user_correlations(
+        self, user, start_date, end_date, min_sample_size, completions=None
+    ):
         habits = list(user.habits.filter(archived=False).order_by("id"))
 
         if len(habits) < 2:
             return 0
 
-        completions = Completion.objects.filter(
-            habit__user=user,
-            date__gte=start_date,
-            date__lte=end_date,
-        ).select_related("habit")
-
-        habit_data = defaultdict(dict)
-        for c in completions:
-            habit_data[c.habit_id][c.date] = float(c.value)
-
-        habit_ids = [h.id for h in habits if h.id in habit_data]
-        if len(habit_ids) < 2:
+        if completions is None:
+            completions = next(
+                self.iter_completion_blocks(
+                    User.objects.filter(id=user.id), start_date, end_date
+                ),
+                (user.id, EMPTY_COMPLETIONS),
+            )[1]
+        habit_col, day_col, value_col = completions
+
+        # Active habits with data; dates with data from any habit
+        active_ids = np.array([h.id for h in habits], dtype=np.int64)
+        habit_ids_arr = active_ids[np.isin(active_ids, habit_col)]
+        if len(habit_ids_arr) < 2:
             return 0
 
         habit_map = {h.id: h for h in habits}
+        habit_ids = habit_ids_arr.tolist()
 
-        all_dates = sorted(
-            {date for values in habit_data.values() for date in values.keys()}
-        )
+        all_days = np.unique(day_col)
 
-        if len(all_dates) < min_sample_size:
+        if len(all_days) < min_sample_size:
             return 0
 
         num_habits = len(habit_ids)
-        num_dates = len(all_dates)
+        num_dates = len(all_days)
 
-        # Raw matrix with NaN for missing data
-        raw = np.full((num_habits, num_dates), 0, dtype=np.float64)
-        
-        for i, habit_id in enumerate(habit_ids):
-            for j, date in enumerate(all_dates):
-                if date in habit_data[habit_id]:
-                    raw[i, j] = habit_data[habit_id][date]
+        # Raw matrix with 0 for missing data, filled by index mapping
+        raw = np.zeros((num_habits, num_dates), dtype=np.float64)
+        keep = np.isin(habit_col, habit_ids_arr)
+        raw[
+            np.searchsorted(habit_ids_arr, habit_col[keep]),
+            np.searchsorted(all_days, day_col[keep]),
+        ] = value_col[keep]
 
         # Normalized matrix (DTW only)
-        norm = np.full_like(raw, np.nan)
-        for i in range(num_habits):
-            row = raw[i]
-            mask = ~np.isnan(row)
-            if mask.sum() == 0:
-                continue
-            min_v = np.nanmin(row)
-            max_v = np.nanmax(row)
-            if max_v > min_v:
-                norm[i, mask] = (row[mask] - min_v) / (max_v - min_v)
-            else:
-                norm[i, mask] = 1.0
+        row_min = raw.min(axis=1, keepdims=True)
+        row_range = raw.max(axis=1, keepdims=True) - row_min
+        with np.errstate(divide="ignore", invalid="ignore"):
+            norm = np.where(row_range > 0, (raw - row_min) / row_range, 1.0)
+
+        # Pearson (raw values) and Spearman (raw values, with p-value
+        # filtering) for all pairs at once
+        pearson_all = pearson_matrix(raw)
+        spearman_all, p_values = spearman_matrix(raw)
+        # Discard Spearman if not statistically significant
+        spearman_all[p_values > 0.05] = np.nan
+
+        # DTW (normalized), only where it can beat the pair's correlation
+        dtw_all = None
+        if self.dtw_window:
+            thresholds = 1 - np.fmax(np.abs(pearson_all), np.abs(spearman_all))
+            thresholds[np.isnan(thresholds)] = 0
+            thresholds = np.minimum(thresholds, 1 - DTW_MIN_SIMILARITY)
+            dtw_all = dtw_matrix(norm, thresholds, self.dtw_window, self.dtw_budget)
+
+        return self.save_correlations(
+            user,
+            habit_map,
+            habit_ids,
+            pearson_all,
+            spearman_all,
+            num_dates,
+            start_date,
+            end_date,
+            dtw_all,
+        )
 
+    def save_correlations(
+        self,
+        user,
+        habit_map,
+        habit_ids,
+        pearson_all,
+        spearman_all,
+        sample_size,
+        start_date,
+        end_date,
+        dtw_all=None,
+    ):
+        """
+        Create or update HabitCorrelation rows for every pair with a valid
+        Pearson coefficient. When spearman_all is None (rolled windows),
+        Spearman and DTW values are cleared rather than kept from an older
+        window, so max_correlation comes from Pearson alone.
+        """
         existing = HabitCorrelation.objects.filter(user=user)
         existing_map = {(c.habit1_id, c.habit2_id): c for c in existing}
 
         to_create = []
         to_update = []
+        num_habits = len(habit_ids)
 
         for i in range(num_habits):
             for j in range(i + 1, num_habits):
                 h1_id = habit_ids[i]
                 h2_id = habit_ids[j]
 
-                x = raw[i]
-                y = raw[j]
-
-                overlap_mask = ~np.isnan(x) & ~np.isnan(y)
-                overlap = overlap_mask.sum()
-
-                if overlap < min_sample_size:
-                    continue
-
-                # Pearson (raw values)
-                with np.errstate(divide="ignore", invalid="ignore"):
-                    pearson = np.corrcoef(x[overlap_mask], y[overlap_mask])[0, 1]
-
+                pearson = pearson_all[i, j]
                 if np.isnan(pearson):
                     continue
 
-                # Spearman (raw values, with p-value filtering)
-                with np.errstate(divide="ignore", invalid="ignore"):
-                    spearman, p_value = spearmanr(
-                        x[overlap_mask],
-                        y[overlap_mask],
-                    )
-                    # Discard if not statistically significant
-                    if p_value > 0.05:
-                        spearman = np.nan
-
-                # DTW (normalized)
-                dtw_value = None
-                # nx = norm[i][overlap_mask]
-                # ny = norm[j][overlap_mask]
-                # if len(nx) > 1 and len(ny) > 1:
-                #     dist = dtw.distance(nx, ny)
-                #     dtw_value = dist / (len(nx) + len(ny))
+                spearman = np.nan if spearman_all is None else spearman_all[i, j]
+
+                dtw_value = np.nan if dtw_all is None else dtw_all[i, j]
 
                 pearson_d = Decimal(str(round(float(pearson), 4)))
                 spearman_d = (
@@ -178,7 +662,7 @@ class Command(BaseCommand):
                 )
                 dtw_d = (
                     None
-                    if dtw_value is None
+                    if np.isnan(dtw_value)
                     else Decimal(str(round(float(dtw_value), 4)))
                 )
 
@@ -189,7 +673,7 @@ class Command(BaseCommand):
                     obj.pearson_coefficient = pearson_d
                     obj.spearman_coefficient = spearman_d
                     obj.dtw_distance = dtw_d
-                    obj.sample_size = num_dates
+                    obj.sample_size = sample_size
                     obj.start_date = start_date
                     obj.end_date = end_date
                     to_update.append(obj)
@@ -202,7 +686,7 @@ class Command(BaseCommand):
                             pearson_coefficient=pearson_d,
                             spearman_coefficient=spearman_d,
                             dtw_distance=dtw_d,
-                            sample_size=overlap,
+                            sample_size=sample_size,
                             start_date=start_date,
                             end_date=end_date,
                         )
@@ -230,3 +714,131 @@ class Command(BaseCommand):
             )
 
         return len(to_create) + len(to_update)
+
+    # -------------------------------------------------------------------------
+
+    def roll_user_correlations(
+        self, user, state, start_date, end_date, min_sample_size
+    ):
+        """
+        Slide the user's stored Pearson window to [start_date, end_date] by
+        adding the new days and subtracting the ones that dropped out.
+
+        Returns the correlation count, or None when the stored statistics
+        cannot be rolled forward (missing, habits changed, window length
+        changed, or completions inside the old window were edited) and a
+        full recompute is needed.
+        """
+        stats = CorrelationWindowStats.objects.filter(user=user).first()
+        if stats is None:
+            return None
+
+        habits = list(user.habits.filter(archived=False).order_by("id"))
+        habit_ids = [h.id for h in habits]
+        if (
+            stats.habit_ids != habit_ids
+            or (stats.start_date, stats.end_date)
+            != (state.correlations_start_date, state.correlations_end_date)
+            or stats.end_date - stats.start_date != end_date - start_date
+            or not stats.start_date <= start_date <= stats.end_date
+            or (
+                state.correlations_dirty_from is not None
+                and state.correlations_dirty_from <= stats.end_date
+            )
+        ):
+            return None
+
+        num_habits = len(habit_ids)
+        day_count = stats.day_count
+        sums = np.frombuffer(bytes(stats.sums), dtype=np.float64).copy()
+        products = (
+            np.frombuffer(bytes(stats.products), dtype=np.float64)
+            .reshape(num_habits, num_habits)
+            .copy()
+        )
+
+        dropped = self.window_matrix(
+            user, habit_ids, stats.start_date, start_date - timedelta(days=1)
+        )
+        added = self.window_matrix(
+            user, habit_ids, stats.end_date + timedelta(days=1), end_date
+        )
+        day_count += added.shape[1] - dropped.shape[1]
+        sums += added.sum(axis=1) - dropped.sum(axis=1)
+        products += added @ added.T - dropped @ dropped.T
+
+        self.save_window_stats(
+            user, habit_ids, start_date, end_date, day_count, sums, products
+        )
+
+        if num_habits < 2 or day_count < min_sample_size:
+            return 0
+
+        return self.save_correlations(
+            user,
+            {h.id: h for h in habits},
+            habit_ids,
+            pearson_from_stats(day_count, sums, products),
+            None,
+            day_count,
+            start_date,
+            end_date,
+        )
+
+    def rebuild_window_stats(self, user, start_date, end_date):
+        """Store fresh sufficient statistics for the user's whole window"""
+        habit_ids = list(
+            user.habits.filter(archived=False)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        matrix = self.window_matrix(user, habit_ids, start_date, end_date)
+        self.save_window_stats(
+            user,
+            habit_ids,
+            start_date,
+            end_date,
+            matrix.shape[1],
+            matrix.sum(axis=1),
+            matrix @ matrix.T,
+        )
+
+    def window_matrix(self, user, habit_ids, start_date, end_date):
+        """
+        Habits x days matrix over the days in the range with at least one
+        completion (of any habit, as in compute_user_correlations), with 0
+        where a listed habit has no value.
+        """
+        if start_date > end_date:
+            return np.zeros((len(habit_ids), 0))
+
+        rows = Completion.objects.filter(
+            user=user, date__gte=start_date, date__lte=end_date
+        ).values_list("habit_id", "date", "value")
+
+        row_index = {habit_id: i for i, habit_id in enumerate(habit_ids)}
+        cells = [(habit_id, day, float(value)) for habit_id, day, value in rows]
+        days = sorted({day for _, day, _ in cells})
+        column_index = {day: j for j, day in enumerate(days)}
+
+        matrix = np.zeros((len(habit_ids), len(days)))
+        for habit_id, day, value in cells:
+            if habit_id in row_index:
+                matrix[row_index[habit_id], column_index[day]] = value
+        return matrix
+
+    def save_window_stats(
+        self, user, habit_ids, start_date, end_date, day_count, sums, products
+    ):
+        """Persist the user's window statistics as raw float64 bytes"""
+        CorrelationWindowStats.objects.update_or_create(
+            user=user,
+            defaults={
+                "habit_ids": habit_ids,
+                "start_date": start_date,
+                "end_date": end_date,
+                "day_count": day_count,
+                "sums": np.asarray(sums, dtype=np.float64).tobytes(),
+                "products": np.asarray(products, dtype=np.float64).tobytes(),
+            },
+        )
@@ -0,0 +1,192 @@
+"""
+Management command to fill the database with synthetic users for
+performance work: N users, each with M habits of every habit type,
+categories, tags and D days of sparse completions.
+
+Completions follow each habit's own adherence rate, runs of done and
+skipped days, and a per-user "good day" factor shared by all habits of
+the user, so streaks, summaries and correlations all have something to
+find. Generation is deterministic for a given --seed.
+
+Usage:
+    python manage.py generate_synthetic_data
+    python manage.py generate_synthetic_data --users 50 --habits 3 --days 730
+    python manage.py generate_synthetic_data --clear
+"""
+
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from ...models import Category, Completion, CompletionRollup, Habit, Tag
+
+USERNAME_PREFIX = "synthetic_"
+
+CATEGORY_NAMES = ["Health", "Work", "Learning", "Home"]
+TAG_NAMES = ["morning", "evening", "weekend", "focus", "social", "outdoor"]
+COLORS = ["#1F85DE", "#E5484D", "#30A46C", "#F5A524", "#8E4EC6", "#12A594"]
+
+# Per habit type: (icon, unit)
+HABIT_STYLES = {
+    "boolean": ("check", None),
+    "counter": ("hash", None),
+    "value": ("activity", "km"),
+    "rating": ("star", None),
+}
+
+COMPLETION_BATCH_SIZE = 5000
+
+
+def generate_user(username, habits_per_type, days, rng):
+    """
+    Create one synthetic user with habits_per_type habits of each type and
+    completions for the last `days` days. Returns (user, completion count).
+    """
+    end_date = timezone.now().date()
+    start_date = end_date - timedelta(days=days - 1)
+
+    with transaction.atomic():
+        user = User.objects.create_user(username, f"{username}@example.com")
+        categories = [
+            Category.objects.create(name=name, user=user, order=order)
+            for order, name in enumerate(rng.sample(CATEGORY_NAMES, 3))
+        ]
+        tags = [
+            Tag.objects.create(name=name, user=user, color=rng.choice(COLORS))
+            for name in rng.sample(TAG_NAMES, 4)
+        ]
+
+        habits = []
+        for habit_type, (icon, unit) in HABIT_STYLES.items():
+            for number in range(1, habits_per_type + 1):
+                habit = Habit.objects.create(
+                    name=f"{habit_type.title()} {number}",
+                    habit_type=habit_type,
+                    user=user,
+                    category=rng.choice(categories + [None]),
+                    icon=icon,
+                    color=rng.choice(COLORS),
+                    max_value=5 if habit_type == "rating" else None,
+                    unit=unit,
+                    order=len(habits),
+                )
+                habit.tags.set(rng.sample(tags, rng.randint(0, 2)))
+                habits.append(habit)
+
+        # Shared by the user's habits, which makes them correlate
+        good_days = [rng.random() for _ in range(days)]
+        completions = []
+        for habit in habits:
+            completions += _completions(habit, start_date, good_days, rng)
+        Completion.objects.bulk_create(completions, batch_size=COMPLETION_BATCH_SIZE)
+
+        # bulk_create skips Completion.save, which maintains the rollups
+        CompletionRollup.refresh([habit.id for habit in habits], start_date, end_date)
+
+    return user, len(completions)
+
+
+def _completions(habit, start_date, good_days, rng):
+    """Unsaved completions of one habit, one per done day"""
+    adherence = rng.uniform(0.15, 0.85)
+    # Typical value of counter and value habits
+    scale = rng.uniform(2, 10)
+    done = False
+    completions = []
+    for offset, good_day in enumerate(good_days):
+        # Done days tend to follow done days, and good days help
+        chance = adherence * (0.5 + good_day) + (0.15 if done else -0.1)
+        done = rng.random() < chance
+        if not done:
+            continue
+
+        if habit.habit_type == "boolean":
+            value = Decimal(1)
+        elif habit.habit_type == "counter":
+            value = Decimal(max(1, round(rng.gauss(scale, scale / 3))))
+        elif habit.habit_type == "value":
+            value = Decimal(f"{max(0.1, rng.gauss(scale, scale / 4)):.1f}")
+        else:
+            value = Decimal(min(5, max(1, round(1 + 4 * good_day + rng.gauss(0, 1)))))
+
+        completions.append(
+            Completion(
+                habit=habit,
+                user_id=habit.user_id,
+                date=start_date + timedelta(days=offset),
+                value=value,
+            )
+        )
+    return completions
+
+
+class Command(BaseCommand):
+    help = "Create synthetic users, habits and completions for benchmarking"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--users", type=int, default=10, help="Number of users (default: 10)"
+        )
+        parser.add_argument(
+            "--habits",
+            type=int,
+            default=2,
+            help="Habits of each habit type per user (default: 2)",
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=365,
+            help="Days of completions, ending today (default: 365)",
+        )
+        parser.add_argument(
+            "--seed", type=int, default=0, help="Random seed (default: 0)"
+        )
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help=f"Delete existing {USERNAME_PREFIX}* users first",
+        )
+
+    def handle(self, *args, **options):
+        if options["clear"]:
+            deleted = (
+                User.objects.filter(username__startswith=USERNAME_PREFIX)
+                .delete()[1]
+                .get("auth.User", 0)
+            )
+            self.stdout.write(f"Deleted {deleted} synthetic users")
+
+        rng = random.Random(options["seed"])
+        taken = set(
+            User.objects.filter(username__startswith=USERNAME_PREFIX).values_list(
+                "username", flat=True
+            )
+        )
+
+        created = 0
+        total = 0
+        number = 0
+        while created < options["users"]:
+            number += 1
+            username = f"{USERNAME_PREFIX}{number}"
+            if username in taken:
+                continue
+            user, count = generate_user(
+                username, options["habits"], options["days"], rng
+            )
+            self.stdout.write(f"  {user.username}: {count} completions")
+            created += 1
+            total += count
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✓ Created {created} users with {options['habits'] * len(HABIT_STYLES)} "
+                f"habits and {total} completions in total"
+            )
+        )
@@ -0,0 +1,47 @@
+"""
+Management command to rebuild the weekly and monthly completion rollups.
+Completion writes keep them up to date; run this after bulk imports or
+direct database edits that bypass the models.
+
+Usage:
+    python manage.py rebuild_rollups
+    python manage.py rebuild_rollups --user-id 1
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max, Min
+
+from ...models import Completion, CompletionRollup, Habit, UserDataState
+
+
+class Command(BaseCommand):
+    help = "Rebuild weekly and monthly completion rollups from raw completions"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user-id",
+            type=int,
+            help="Rebuild rollups for a specific user only",
+        )
+
+    def handle(self, *args, **options):
+        habits = Habit.objects.order_by("id")
+        if options["user_id"]:
+            habits = habits.filter(user_id=options["user_id"])
+
+        rebuilt = 0
+        for habit_id, user_id in habits.values_list("id", "user_id"):
+            bounds = Completion.objects.filter(habit_id=habit_id).aggregate(
+                first=Min("date"), last=Max("date")
+            )
+            with transaction.atomic():
+                CompletionRollup.objects.filter(habit_id=habit_id).delete()
+                if bounds["first"] is not None:
+                    CompletionRollup.refresh(
+                        [habit_id], bounds["first"], bounds["last"]
+                    )
+            UserDataState.record_cache_change(user_id)
+            rebuilt += 1
+
+        self.stdout.write(self.style.SUCCESS(f"✓ Rebuilt rollups for {rebuilt} habits"))
@@ -0,0 +1,273 @@
+"""
+Per-request timings, reported as Server-Timing headers and Prometheus metrics.
+
+RequestMetricsMiddleware times every request and, with
+METRICS_SERVER_TIMING (on in development), adds a Server-Timing header
+with:
+- db: time spent in database queries, with the query count
+- render: rendering DRF responses (serialized data to JSON)
+- app: the rest, i.e. view code, serializers and middleware
+- total: from the outermost middleware on
+Streamed bodies are sent after the response is returned and are not
+included.
+
+The same figures feed per-endpoint histograms. They are added up in process
+memory and flushed into the default cache with incr() every
+METRICS_FLUSH_INTERVAL seconds, so a request costs a few perf_counter()
+calls and no cache round trips. With a shared cache backend (Redis), the
+staff-only api/metrics/ endpoint reports all workers together; with the
+default local-memory cache each worker reports its own requests, as for
+the response cache counters.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+KEY_PREFIX = "metrics"
+
+# Cache key listing the (method, endpoint) pairs that have counters
+SERIES_KEY = f"{KEY_PREFIX}:series"
+
+METRIC_PREFIX = "habitsfactory"
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Other methods are counted as "OTHER", to keep the number of series bounded
+METHODS = ("GET", "HEAD", "OPTIONS", "POST", "PUT", "PATCH", "DELETE")
+
+# Upper bounds of the histogram buckets; a last +Inf bucket is implied
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# name: (help, bucket bounds, scale of the integer sums kept in the cache)
+HISTOGRAMS = {
+    "request_duration_seconds": (
+        "Time spent serving the request",
+        SECONDS_BUCKETS,
+        1_000_000,
+    ),
+    "request_db_seconds": (
+        "Time spent in database queries",
+        SECONDS_BUCKETS,
+        1_000_000,
+    ),
+    "request_render_seconds": (
+        "Time spent rendering the response",
+        SECONDS_BUCKETS,
+        1_000_000,
+    ),
+    "request_db_queries": ("Database queries run by the request", QUERY_BUCKETS, 1),
+}
+
+# Not yet flushed observations: {(method, endpoint, histogram, slot): count}
+# where slot is a bucket index or "sum"
+_pending = defaultdict(int)
+_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def _key(method, endpoint, histogram, slot):
+    return f"{KEY_PREFIX}:{method}:{endpoint}:{histogram}:{slot}"
+
+
+def observe(method, endpoint, values):
+    """Add one request's {histogram: value} to the pending observations"""
+    with _lock:
+        for histogram, value in values.items():
+            _, buckets, scale = HISTOGRAMS[histogram]
+            _pending[method, endpoint, histogram, bisect_left(buckets, value)] += 1
+            _pending[method, endpoint, histogram, "sum"] += round(value * scale)
+
+
+def flush():
+    """Add the pending observations of this process to the shared counters"""
+    global _last_flush
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _last_flush = time.monotonic()
+    if not pending:
+        return
+
+    series = {(method, endpoint) for method, endpoint, _, _ in pending}
+    known = {tuple(item) for item in cache.get(SERIES_KEY, [])}
+    if not series <= known:
+        # Racing workers may drop each other's new series; they are added
+        # back on their next flush
+        cache.set(SERIES_KEY, sorted(known | series), timeout=None)
+
+    for (method, endpoint, histogram, slot), delta in pending.items():
+        key = _key(method, endpoint, histogram, slot)
+        cache.add(key, 0, timeout=None)
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            # Evicted between add() and incr(); losing these counts is fine
+            pass
+
+
+def _flush_due():
+    return time.monotonic() - _last_flush >= settings.METRICS_FLUSH_INTERVAL
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_metrics(cache_counts=None):
+    """
+    Return the shared counters in the Prometheus text format, followed by
+    the response cache counters ({endpoint: {outcome: count}}) if given
+    """
+    series = sorted(tuple(item) for item in cache.get(SERIES_KEY, []))
+    keys = [
+        _key(method, endpoint, histogram, slot)
+        for method, endpoint in series
+        for histogram, (_, buckets, _) in HISTOGRAMS.items()
+        for slot in [*range(len(buckets) + 1), "sum"]
+    ]
+    counts = cache.get_many(keys)
+
+    lines = []
+    for histogram, (help_text, buckets, scale) in HISTOGRAMS.items():
+        name = f"{METRIC_PREFIX}_{histogram}"
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for method, endpoint in series:
+            labels = f'method="{_label(method)}",endpoint="{_label(endpoint)}"'
+            cumulative = 0
+            for index, bound in enumerate([*buckets, "+Inf"]):
+                cumulative += counts.get(_key(method, endpoint, histogram, index), 0)
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            total = counts.get(_key(method, endpoint, histogram, "sum"), 0) / scale
+            lines.append(f"{name}_sum{{{labels}}} {total}")
+            lines.append(f"{name}_count{{{labels}}} {cumulative}")
+
+    if cache_counts is not None:
+        name = f"{METRIC_PREFIX}_analytics_cache_requests_total"
+        lines += [
+            f"# HELP {name} Cached analytics requests by outcome",
+            f"# TYPE {name} counter",
+        ]
+        for endpoint, outcomes in sorted(cache_counts.items()):
+            for outcome, count in outcomes.items():
+                lines.append(
+                    f'{name}{{endpoint="{_label(endpoint)}",outcome="{outcome}"}} {count}'
+                )
+
+    return "\n".join(lines) + "\n"
+
+
+class _RequestTimer:
+    """Execute wrapper counting the queries of one request, plus its timestamps"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_start = self.render_end = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+    def rendered(self, response):
+        self.render_end = time.perf_counter()
+
+
+class RequestMetricsMiddleware:
+    """
+    Record every request in the per-endpoint histograms and, with
+    METRICS_SERVER_TIMING, add a Server-Timing header to the response.
+    Should come first in MIDDLEWARE so that total covers the other
+    middleware too.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        request._timer = timer = _RequestTimer()
+        with self._timed_queries(timer):
+            response = self.get_response(request)
+        self._record(request, response, timer)
+        if _flush_due():
+            flush()
+        return response
+
+    async def __acall__(self, request):
+        request._timer = timer = _RequestTimer()
+        # Database connections are per thread; wrap the ones of the thread
+        # that runs this request's sync_to_async() calls
+        timed_queries = await sync_to_async(self._timed_queries)(timer)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(timed_queries.close)()
+        self._record(request, response, timer)
+        if _flush_due():
+            await sync_to_async(flush)()
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered right after this hook returns
+        timer = request._timer
+        timer.render_start = time.perf_counter()
+        response.add_post_render_callback(timer.rendered)
+        return response
+
+    def _timed_queries(self, timer):
+        """Install timer as execute wrapper; closing the stack removes it"""
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(timer))
+        return stack
+
+    def _record(self, request, response, timer):
+        total = time.perf_counter() - timer.start
+        render = 0.0
+        if timer.render_end is not None:
+            render = timer.render_end - timer.render_start
+        app = max(total - timer.db_time - render, 0.0)
+
+        # Sent to every client, anonymous ones included, so off in production
+        if settings.METRICS_SERVER_TIMING:
+            response["Server-Timing"] = ", ".join(
+                [
+                    f'db;dur={timer.db_time * 1000:.1f};desc="{timer.queries} queries"',
+                    f"render;dur={render * 1000:.1f}",
+                    f"app;dur={app * 1000:.1f}",
+                    f"total;dur={total * 1000:.1f}",
+                ]
+            )
+
+        match = request.resolver_match
+        observe(
+            request.method if request.method in METHODS else "OTHER",
+            match.view_name if match else "unmatched",
+            {
+                "request_duration_seconds": total,
+                "request_db_seconds": timer.db_time,
+                "request_render_seconds": render,
+                "request_db_queries": timer.queries,
+            },
+        )
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.10 on 2026-10-17 06:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0013_alter_habitcorrelation_options_and_more"),
+        ("auth", "0012_alter_user_first_name_max_length"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserDataState",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="data_state",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("min_date", models.DateField(blank=True, null=True)),
+                ("max_date", models.DateField(blank=True, null=True)),
+                ("bounds_valid", models.BooleanField(default=False)),
+            ],
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.10 on 2026-10-17 06:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0014_userdatastate"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userdatastate",
+            name="correlations_end_date",
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="userdatastate",
+            name="correlations_start_date",
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="userdatastate",
+            name="correlations_version",
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="userdatastate",
+            name="data_version",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
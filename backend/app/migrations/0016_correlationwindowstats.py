@@ -0,0 +1,46 @@
+# Generated by Django 5.2.10 on 2026-10-17 06:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0015_userdatastate_data_version"),
+        ("auth", "0012_alter_user_first_name_max_length"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CorrelationWindowStats",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="correlation_window_stats",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("start_date", models.DateField()),
+                ("end_date", models.DateField()),
+                ("habit_ids", models.JSONField(default=list)),
+                ("day_count", models.IntegerField(default=0)),
+                ("sums", models.BinaryField()),
+                ("products", models.BinaryField()),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name_plural": "Correlation window stats",
+            },
+        ),
+        migrations.AddField(
+            model_name="userdatastate",
+            name="correlations_dirty_from",
+            field=models.DateField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.10 on 2026-10-17 07:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0016_correlationwindowstats"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="habit",
+            options={"ordering": ["order", "name"]},
+        ),
+        migrations.AddField(
+            model_name="habit",
+            name="order",
+            field=models.IntegerField(default=0),
+        ),
+    ]
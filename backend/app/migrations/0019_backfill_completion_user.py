@@ -0,0 +1,33 @@
+from django.db import migrations
+from django.db.models import Max, Min, OuterRef, Subquery
+
+# Completion ids updated per statement; each batch commits on its own so a
+# large table is never locked in one long transaction
+BATCH_SIZE = 10000
+
+
+def backfill_completion_user(apps, schema_editor):
+    Completion = apps.get_model("app", "Completion")
+    Habit = apps.get_model("app", "Habit")
+
+    habit_user = Habit.objects.filter(id=OuterRef("habit_id")).values("user_id")[:1]
+    bounds = Completion.objects.aggregate(first=Min("id"), last=Max("id"))
+    if bounds["first"] is None:
+        return
+
+    for start in range(bounds["first"], bounds["last"] + 1, BATCH_SIZE):
+        Completion.objects.filter(
+            id__gte=start, id__lt=start + BATCH_SIZE, user__isnull=True
+        ).update(user_id=Subquery(habit_user))
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("app", "0018_completion_user"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_completion_user, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-17 07:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0020_completion_user_not_null"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userdatastate",
+            name="cache_version",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
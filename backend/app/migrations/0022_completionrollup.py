@@ -0,0 +1,86 @@
+# Generated by Django 5.2.10 on 2026-10-17 07:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+
+# Habits whose completions are aggregated per statement
+HABIT_BATCH_SIZE = 500
+
+
+def build_rollups(apps, schema_editor):
+    Completion = apps.get_model("app", "Completion")
+    CompletionRollup = apps.get_model("app", "CompletionRollup")
+    Habit = apps.get_model("app", "Habit")
+
+    habit_ids = list(Habit.objects.order_by("id").values_list("id", flat=True))
+    for offset in range(0, len(habit_ids), HABIT_BATCH_SIZE):
+        batch = habit_ids[offset : offset + HABIT_BATCH_SIZE]
+        for granularity, truncate in (("week", TruncWeek), ("month", TruncMonth)):
+            buckets = (
+                Completion.objects.filter(habit_id__in=batch, value__gt=0)
+                .annotate(period_start=truncate("date"))
+                .values("habit_id", "period_start")
+                .annotate(
+                    count=Count("value"),
+                    sum=Sum("value"),
+                    min=Min("value"),
+                    max=Max("value"),
+                )
+                .order_by()
+            )
+            CompletionRollup.objects.bulk_create(
+                (
+                    CompletionRollup(granularity=granularity, **bucket)
+                    for bucket in buckets
+                ),
+                batch_size=1000,
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0021_userdatastate_cache_version"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CompletionRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "granularity",
+                    models.CharField(
+                        choices=[("week", "Week"), ("month", "Month")], max_length=5
+                    ),
+                ),
+                ("period_start", models.DateField()),
+                ("count", models.PositiveIntegerField()),
+                ("sum", models.DecimalField(decimal_places=2, max_digits=14)),
+                ("min", models.DecimalField(decimal_places=2, max_digits=10)),
+                ("max", models.DecimalField(decimal_places=2, max_digits=10)),
+                (
+                    "habit",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="rollups",
+                        to="app.habit",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("habit", "granularity", "period_start")},
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
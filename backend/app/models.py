@@ -1,6 +1,12 @@
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import Count, Exists, F, Max, Min, OuterRef, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, Least, TruncMonth, TruncWeek
 from django.utils import timezone
+from datetime import date, timedelta
 from django.contrib.auth.models import User
+import time
+import uuid
 
 
 class Category(models.Model):
@@ -15,6 +21,16 @@ class Category(models.Model):
     def __str__(self):
         return f"{self.name}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        UserDataState.record_cache_change(self.user_id)
+
+    def delete(self, *args, **kwargs):
+        user_id = self.user_id
+        result = super().delete(*args, **kwargs)
+        UserDataState.record_cache_change(user_id)
+        return result
+
 
 class Tag(models.Model):
     name = models.CharField(max_length=50)
@@ -29,6 +45,16 @@ class Tag(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        UserDataState.record_cache_change(self.user_id)
+
+    def delete(self, *args, **kwargs):
+        user_id = self.user_id
+        result = super().delete(*args, **kwargs)
+        UserDataState.record_cache_change(user_id)
+        return result
+
 
 class Habit(models.Model):
     TYPE_CHOICES = [
@@ -62,28 +88,358 @@ class Habit(models.Model):
     )
     archived = models.BooleanField(default=False)
     tags = models.ManyToManyField(Tag, blank=True, related_name="habits")
+    order = models.IntegerField(default=0)
 
     class Meta:
-        ordering = ["name"]
+        ordering = ["order", "name"]
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_user_id = instance.__dict__.get("user_id")
+        instance._loaded_archived = instance.__dict__.get("archived")
+        return instance
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        loaded_user_id = getattr(self, "_loaded_user_id", None)
+        loaded_archived = getattr(self, "_loaded_archived", None)
+        if loaded_user_id is not None and loaded_user_id != self.user_id:
+            # Keep the denormalized Completion.user in step with a reassigned habit
+            self.completions.update(user_id=self.user_id)
+            UserDataState.record_data_change(loaded_user_id)
+        if adding or loaded_user_id != self.user_id or loaded_archived != self.archived:
+            # These change which completions count towards analytics
+            UserDataState.record_data_change(self.user_id)
+        else:
+            # Names, colours and order only show up in cached responses
+            UserDataState.record_cache_change(self.user_id)
+        self._loaded_user_id = self.user_id
+        self._loaded_archived = self.archived
+
+    def delete(self, *args, **kwargs):
+        user_id = self.user_id
+        result = super().delete(*args, **kwargs)
+        UserDataState.record_data_change(user_id)
+        return result
+
 
 class Completion(models.Model):
     habit = models.ForeignKey(
         Habit, related_name="completions", on_delete=models.CASCADE
     )
+    # Denormalized from habit.user so analytics scans avoid the join through
+    # Habit; set in save() and kept in step by Habit.save()
+    user = models.ForeignKey(
+        User,
+        related_name="completions",
+        on_delete=models.CASCADE,
+        editable=False,
+        db_index=False,  # covered by completion_user_date_idx
+    )
     date = models.DateField(default=timezone.now)
     value = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
 
     class Meta:
         unique_together = ["habit", "date"]
         ordering = ["-date"]
+        indexes = [
+            # Per-user date range scans, index-only for (habit_id, value)
+            models.Index(
+                fields=["user", "date", "habit", "value"],
+                name="completion_user_date_idx",
+            )
+        ]
 
     def __str__(self):
         return f"{self.habit.name} - {self.date}"
 
+    def save(self, *args, **kwargs):
+        # Only look the habit up when it is not loaded; Habit.save keeps
+        # user_id in step for completions that are already saved
+        if Completion.habit.is_cached(self):
+            self.user_id = self.habit.user_id
+        elif self.user_id is None:
+            self.user_id = Habit.objects.values_list("user_id", flat=True).get(
+                pk=self.habit_id
+            )
+        super().save(*args, **kwargs)
+        CompletionRollup.refresh([self.habit_id], self.date)
+        UserDataState.record_completion_write(self.user_id, self.date)
+
+    def delete(self, *args, **kwargs):
+        user_id, habit_id, completion_date = self.user_id, self.habit_id, self.date
+        result = super().delete(*args, **kwargs)
+        CompletionRollup.refresh([habit_id], completion_date)
+        UserDataState.record_data_change(user_id)
+        return result
+
+
+class CompletionRollup(models.Model):
+    """
+    Per-habit weekly and monthly aggregates of completions with a positive
+    value, so long-range graphs and summaries read one row per bucket
+    instead of one per day. Kept up to date by Completion writes; rebuild
+    with the rebuild_rollups command.
+    """
+
+    GRANULARITY_CHOICES = [
+        ("week", "Week"),
+        ("month", "Month"),
+    ]
+    TRUNCATE = {"week": TruncWeek, "month": TruncMonth}
+
+    habit = models.ForeignKey(Habit, related_name="rollups", on_delete=models.CASCADE)
+    granularity = models.CharField(max_length=5, choices=GRANULARITY_CHOICES)
+    # Monday of the week, or first day of the month
+    period_start = models.DateField()
+    count = models.PositiveIntegerField()
+    sum = models.DecimalField(max_digits=14, decimal_places=2)
+    min = models.DecimalField(max_digits=10, decimal_places=2)
+    max = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        unique_together = ["habit", "granularity", "period_start"]
+
+    def __str__(self):
+        return f"{self.habit.name} - {self.granularity} of {self.period_start}"
+
+    @staticmethod
+    def period_start_of(granularity, day):
+        if granularity == "week":
+            return day - timedelta(days=day.weekday())
+        return day.replace(day=1)
+
+    @staticmethod
+    def period_end_of(granularity, day):
+        if granularity == "week":
+            return day + timedelta(days=6 - day.weekday())
+        next_month = (day.replace(day=1) + timedelta(days=31)).replace(day=1)
+        return next_month - timedelta(days=1)
+
+    @classmethod
+    def bucket_completions(cls, completions, granularity):
+        """
+        Group a Completion queryset into buckets. Returns a values queryset
+        of habit_id, period_start, count, sum, min and max.
+        """
+        return (
+            completions.filter(value__gt=0)
+            .annotate(period_start=cls.TRUNCATE[granularity]("date"))
+            .values("habit_id", "period_start")
+            .annotate(
+                count=Count("value"),
+                sum=Sum("value"),
+                min=Min("value"),
+                max=Max("value"),
+            )
+            .order_by()
+        )
+
+    @classmethod
+    def period_count(cls, granularity, first_date, last_date):
+        """Number of buckets of granularity covering first_date to last_date"""
+        if granularity == "week":
+            start = cls.period_start_of("week", first_date)
+            return (last_date - start).days // 7 + 1
+        return (
+            (last_date.year - first_date.year) * 12
+            + last_date.month
+            - first_date.month
+            + 1
+        )
+
+    @classmethod
+    def refresh(cls, habit_ids, first_date, last_date=None):
+        """
+        Recompute the buckets of the given habits that contain any date
+        between first_date and last_date.
+
+        The habit rows are locked for the rest of the transaction, so
+        concurrent writes to the same habits refresh one after the other and
+        the last refresh sees every completion. Buckets are upserted, and
+        deleted only when no completion is left in them.
+        """
+        last_date = last_date or first_date
+        habit_ids = list(habit_ids)
+        ranges = {
+            granularity: (
+                cls.period_start_of(granularity, first_date),
+                cls.period_end_of(granularity, last_date),
+            )
+            for granularity, _ in cls.GRANULARITY_CHOICES
+        }
+        week_buckets, month_buckets = (
+            cls.bucket_completions(
+                Completion.objects.filter(
+                    habit_id__in=habit_ids, date__gte=start, date__lte=end
+                ),
+                granularity,
+            ).annotate(granularity=Value(granularity))
+            for granularity, (start, end) in ranges.items()
+        )
+
+        with transaction.atomic(savepoint=False):
+            # A no-op on SQLite, which locks the whole database for writes
+            list(
+                Habit.objects.select_for_update()
+                .filter(id__in=habit_ids)
+                .order_by("id")
+                .values_list("id", flat=True)
+            )
+            buckets = [
+                cls(**bucket) for bucket in week_buckets.union(month_buckets, all=True)
+            ]
+            if buckets:
+                cls.objects.bulk_create(
+                    buckets,
+                    update_conflicts=True,
+                    unique_fields=["habit", "granularity", "period_start"],
+                    update_fields=["count", "sum", "min", "max"],
+                )
+
+            for granularity, (start, end) in ranges.items():
+                found = sum(bucket.granularity == granularity for bucket in buckets)
+                if found == len(habit_ids) * cls.period_count(granularity, start, end):
+                    continue
+                # Some buckets may have lost their last completion
+                cls.objects.filter(
+                    habit_id__in=habit_ids,
+                    granularity=granularity,
+                    period_start__gte=start,
+                    period_start__lte=end,
+                ).exclude(
+                    Exists(
+                        Completion.objects.filter(
+                            habit_id=OuterRef("habit_id"), value__gt=0
+                        )
+                        .annotate(period_start=cls.TRUNCATE[granularity]("date"))
+                        .filter(period_start=OuterRef("period_start"))
+                    )
+                ).delete()
+
+
+class UserDataState(models.Model):
+    """
+    Per-user bookkeeping about completion data, kept up to date by
+    completion and habit writes so read endpoints and batch jobs can skip
+    scanning completions.
+
+    data_version is bumped on every write; the cached bounds cover
+    completions of non-archived habits. The correlations_* fields record
+    the data version and window of the last compute_correlations run, and
+    the earliest completion date written since then. cache_version is
+    bumped by anything that can change an analytics response (data,
+    category and tag writes, correlation runs) and keys the response cache.
+    """
+
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name="data_state"
+    )
+    min_date = models.DateField(null=True, blank=True)
+    max_date = models.DateField(null=True, blank=True)
+    bounds_valid = models.BooleanField(default=False)
+    data_version = models.PositiveBigIntegerField(default=0)
+
+    correlations_version = models.PositiveBigIntegerField(null=True, blank=True)
+    correlations_start_date = models.DateField(null=True, blank=True)
+    correlations_end_date = models.DateField(null=True, blank=True)
+    correlations_dirty_from = models.DateField(null=True, blank=True)
+
+    cache_version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Data state for {self.user}"
+
+    @classmethod
+    def get_completion_bounds(cls, user):
+        """Return (min_date, max_date), recomputing them if not cached"""
+        state = cls.objects.filter(user=user).first()
+        if state is None:
+            # Writes only bump existing rows, so create it before aggregating
+            state, _ = cls.objects.get_or_create(user=user)
+        if state.bounds_valid:
+            return state.min_date, state.max_date
+
+        bounds = Completion.objects.filter(user=user, habit__archived=False).aggregate(
+            min_date=Min("date"), max_date=Max("date")
+        )
+        # Skipped if a write bumped the version meanwhile; the bounds then
+        # stay invalid and the next read recomputes them
+        cls.objects.filter(user=user, data_version=state.data_version).update(
+            **bounds, bounds_valid=True
+        )
+        return bounds["min_date"], bounds["max_date"]
+
+    @classmethod
+    async def aget_completion_bounds(cls, user):
+        """Async version of get_completion_bounds()"""
+        state = await cls.objects.filter(user=user).afirst()
+        if state is None:
+            state, _ = await cls.objects.aget_or_create(user=user)
+        if state.bounds_valid:
+            return state.min_date, state.max_date
+
+        bounds = await Completion.objects.filter(
+            user=user, habit__archived=False
+        ).aaggregate(min_date=Min("date"), max_date=Max("date"))
+        await cls.objects.filter(user=user, data_version=state.data_version).aupdate(
+            **bounds, bounds_valid=True
+        )
+        return bounds["min_date"], bounds["max_date"]
+
+    @classmethod
+    def record_completion_write(cls, user_id, first_date, last_date=None):
+        """
+        Bump the data version and widen the cached bounds to the written
+        date (or range of dates, for bulk writes)
+        """
+        last_date = last_date or first_date
+        # Stale bounds are recomputed on read, so widening them is harmless
+        cls.objects.filter(user_id=user_id).update(
+            data_version=F("data_version") + 1,
+            cache_version=F("cache_version") + 1,
+            min_date=Least(Coalesce("min_date", Value(first_date)), Value(first_date)),
+            max_date=Greatest(Coalesce("max_date", Value(last_date)), Value(last_date)),
+            correlations_dirty_from=Least(
+                Coalesce("correlations_dirty_from", Value(first_date)),
+                Value(first_date),
+            ),
+        )
+
+    @classmethod
+    def record_data_change(cls, user_id):
+        """Bump the data version and mark cached bounds stale"""
+        # Any date may be affected, so the whole history counts as dirty
+        cls.objects.filter(user_id=user_id).update(
+            data_version=F("data_version") + 1,
+            cache_version=F("cache_version") + 1,
+            bounds_valid=False,
+            correlations_dirty_from=date.min,
+        )
+
+    @classmethod
+    def get_cache_version(cls, user):
+        """Return the user's cache version, creating the state row if needed"""
+        # The row must exist for later writes to bump it
+        state, _ = cls.objects.only("cache_version").get_or_create(user=user)
+        return state.cache_version
+
+    @classmethod
+    async def aget_cache_version(cls, user):
+        """Async version of get_cache_version()"""
+        state, _ = await cls.objects.only("cache_version").aget_or_create(user=user)
+        return state.cache_version
+
+    @classmethod
+    def record_cache_change(cls, user_id):
+        """Bump the cache version for writes that leave completion data as is"""
+        cls.objects.filter(user_id=user_id).update(cache_version=F("cache_version") + 1)
+
 
 class HabitCorrelation(models.Model):
     """
@@ -124,7 +480,7 @@ class HabitCorrelation(models.Model):
         help_text="Spearman rank correlation (handles ordinal data better)",
     )
 
-    # DTW distance (0+) - normalized 0-1, lower = more similar
+    # DTW distance relative to a day-shuffled baseline (0-1), lower = more similar
     dtw_distance = models.DecimalField(
         max_digits=5,
         decimal_places=4,
@@ -181,8 +537,8 @@ class HabitCorrelation(models.Model):
         if self.spearman_coefficient is not None:
             correlations.append(abs(float(self.spearman_coefficient)))
 
-        # DTW distance: 0+ (normalized 0-1), invert it (1 - distance)
-        # so that 0 distance becomes 1 (perfect match)
+        # DTW distance: 0-1 (1 = no closer than chance), invert it
+        # (1 - distance) so that 0 distance becomes 1 (perfect match)
         if self.dtw_distance is not None:
             correlations.append(1 - float(self.dtw_distance))
 
@@ -193,6 +549,45 @@ class HabitCorrelation(models.Model):
         super().save(*args, **kwargs)
 
 
+class CorrelationWindowStats(models.Model):
+    """
+    Pearson sufficient statistics for a user's current correlation window,
+    so compute_correlations --rolling can slide the window by adding the
+    newest days and subtracting the ones that drop out.
+
+    For the habits x days window matrix X of the listed habits:
+    day_count = n, sums = row sums (Σx), products = X·Xᵀ (Σxy, with Σx²
+    on the diagonal). Arrays are stored as raw float64 bytes.
+    """
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="correlation_window_stats",
+    )
+    start_date = models.DateField()
+    end_date = models.DateField()
+    habit_ids = models.JSONField(default=list)
+    day_count = models.IntegerField(default=0)
+    sums = models.BinaryField()
+    products = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Correlation window stats"
+
+    def __str__(self):
+        return (
+            f"Correlation window for {self.user}: {self.start_date} - {self.end_date}"
+        )
+
+
+# Seconds a worker reuses its copy of SiteSettings without re-reading it
+SITE_SETTINGS_TTL = 60
+SITE_SETTINGS_VERSION_KEY = "site-settings:version"
+
+
 class SiteSettings(models.Model):
     """
     Site-wide settings that can only be modified by admin users.
@@ -221,16 +616,48 @@ class SiteSettings(models.Model):
     def __str__(self):
         return "Site Settings"
 
+    # Per-process copy: (instance, shared version stamp, monotonic expiry)
+    _cached = None
+
+    @classmethod
+    def get_settings(cls, cached=True):
+        """
+        Get or create the singleton settings instance.
+
+        By default it comes from a per-process copy, reloaded when the
+        version stamp in the shared cache changes (another worker saved the
+        settings) or after SITE_SETTINGS_TTL seconds. The TTL is the only
+        bound with a process-local cache backend such as LocMemCache, where
+        other workers never see the stamp. The copy is shared between
+        requests: pass cached=False to get an instance to modify.
+        """
+        if not cached:
+            return cls._load()
+
+        version = cache.get(SITE_SETTINGS_VERSION_KEY)
+        entry = cls._cached
+        if entry and entry[1] == version and time.monotonic() < entry[2]:
+            return entry[0]
+
+        settings = cls._load()
+        cls._cached = (settings, version, time.monotonic() + SITE_SETTINGS_TTL)
+        return settings
+
     @classmethod
-    def get_settings(cls):
-        """Get or create the singleton settings instance"""
-        settings, created = cls.objects.get_or_create(pk=1)
+    def _load(cls):
+        # Plain read first: get_or_create would open a transaction to write
+        settings = cls.objects.filter(pk=1).first()
+        if settings is None:
+            settings, _ = cls.objects.get_or_create(pk=1)
         return settings
 
     def save(self, *args, **kwargs):
         # Ensure only one instance exists (singleton pattern)
         self.pk = 1
         super().save(*args, **kwargs)
+        # New stamp makes every worker reload on its next get_settings()
+        SiteSettings._cached = None
+        cache.set(SITE_SETTINGS_VERSION_KEY, uuid.uuid4().hex, None)
 
     def delete(self, *args, **kwargs):
         # Prevent deletion of settings
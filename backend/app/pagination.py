@@ -0,0 +1,144 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are ordered by a sort tuple that is unique within the queryset, and
+the cursor holds the last row's values of that tuple. The next page is
+fetched with a WHERE (a, b, c) > (x, y, z) condition instead of an OFFSET,
+so a deep page costs the same as the first, and no COUNT query is run.
+"""
+
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    # Sort tuple, "-" prefix for descending; must be unique within a page's queryset
+    ordering = ("id",)
+    page_size = 50
+    max_page_size = 200
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    # When True, requests without a cursor or page_size are left unpaginated
+    optional = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.optional and not (
+            self.cursor_query_param in params or self.page_size_query_param in params
+        ):
+            return None
+
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request, queryset.model)
+        if position is not None:
+            queryset = queryset.filter(self.after(position))
+
+        rows = list(queryset[: self.page_size + 1])
+        self.next_position = None
+        if len(rows) > self.page_size:
+            rows = rows[: self.page_size]
+            self.next_position = [
+                getattr(rows[-1], field.lstrip("-")) for field in self.ordering
+            ]
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def after(self, position):
+        """
+        Q matching rows that sort after position: (a > x) OR (a = x AND b > y) ...
+        with > flipped to < for descending fields
+        """
+        condition = Q()
+        equal_so_far = Q()
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition |= equal_so_far & Q(**{f"{name}__{lookup}": value})
+            equal_so_far &= Q(**{name: value})
+        return condition
+
+    def decode_cursor(self, request, model):
+        """Return the cursor's position, with values converted to model fields"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+        except (TypeError, ValueError):
+            raise NotFound("Invalid cursor")
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound("Invalid cursor")
+
+        values = []
+        for field_name, value in zip(self.ordering, position):
+            field = model._meta.get_field(field_name.lstrip("-"))
+            try:
+                value = field.to_python(value)
+            except (ValidationError, TypeError):
+                raise NotFound("Invalid cursor")
+            if value is None and not field.null:
+                raise NotFound("Invalid cursor")
+            values.append(value)
+        return values
+
+    def encode_cursor(self, position):
+        # Dates and decimals are sent as strings; decode_cursor converts them back
+        data = json.dumps(position, default=str, separators=(",", ":"))
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return replace_query_param(
+            self.base_url,
+            self.cursor_query_param,
+            self.encode_cursor(self.next_position),
+        )
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
+class HabitPagination(KeysetPagination):
+    # Matches Habit.Meta.ordering, with id to break ties
+    ordering = ("order", "name", "id")
+    optional = True
+
+
+class CorrelationPagination(KeysetPagination):
+    ordering = ("-max_correlation", "-id")
+    page_size = 20
+    optional = True
+
+
+class CompletionHistoryPagination(KeysetPagination):
+    # A habit has at most one completion per date
+    ordering = ("-date",)
+    page_size = 100
+    max_page_size = 1000
@@ -0,0 +1,220 @@
+"""
+Per-user versioned cache for analytics responses.
+
+Cached responses are keyed by (user, endpoint, normalized query params,
+user cache version). Writes bump UserDataState.cache_version instead of
+deleting keys, so invalidation never has to find or scan old entries; they
+simply stop being read and expire after ANALYTICS_CACHE_TIMEOUT.
+
+Only needs get/set/add/incr from the cache backend, so it works with the
+local-memory, file-based and Redis backends alike. Hit and miss counts are
+kept per endpoint in the same cache, see cache_stats().
+
+The same key gives each response a strong ETag, so a client revalidating
+with If-None-Match gets a 304 after a single version lookup, before the
+view runs any of its queries or serializes anything.
+"""
+
+import hashlib
+from datetime import date
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import parse_etags
+from rest_framework.response import Response
+
+from .models import UserDataState
+
+KEY_PREFIX = "analytics"
+
+# Names of the endpoints wrapped with cached_response or
+# conditional_response, for cache_stats()
+ENDPOINTS = []
+
+OUTCOMES = ("hits", "misses", "not_modified")
+
+
+def _count(outcome, endpoint):
+    key = f"{KEY_PREFIX}:stats:{endpoint}:{outcome}"
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr(); losing one count is fine
+        pass
+
+
+async def _acount(outcome, endpoint):
+    key = f"{KEY_PREFIX}:stats:{endpoint}:{outcome}"
+    await cache.aadd(key, 0, timeout=None)
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        pass
+
+
+def cache_key(user_id, endpoint, version, params, kwargs=None):
+    """Build the cache key for a request, normalizing the query params"""
+    normalized = sorted(
+        (name, tuple(sorted(values))) for name, values in params.lists()
+    )
+    if kwargs:
+        normalized.append(("", tuple(sorted(kwargs.items()))))
+    # Default date ranges end today, so responses roll over at midnight
+    normalized.append(("", date.today().isoformat()))
+    digest = hashlib.sha256(repr(normalized).encode()).hexdigest()[:32]
+    return f"{KEY_PREFIX}:{user_id}:{endpoint}:{version}:{digest}"
+
+
+def _etag(key):
+    """Strong ETag for a cache key; it already identifies the response content"""
+    return f'"{hashlib.sha256(key.encode()).hexdigest()[:32]}"'
+
+
+def _conditional_headers(etag):
+    # Clients keep the body but must revalidate it on every use
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+
+def _is_not_modified(request, etag):
+    if_none_match = request.headers.get("If-None-Match")
+    if not if_none_match:
+        return False
+    etags = parse_etags(if_none_match)
+    return "*" in etags or etag in etags
+
+
+def _request_key(request, endpoint, kwargs):
+    version = UserDataState.get_cache_version(request.user)
+    return cache_key(request.user.id, endpoint, version, request.query_params, kwargs)
+
+
+def cached_response(endpoint):
+    """
+    Cache the data of successful Response objects returned by a viewset
+    method. Other responses (errors, streaming) are passed through uncached.
+    Adds an X-Cache: HIT/MISS header, and an ETag so that a matching
+    If-None-Match gets a 304 without touching the cache.
+    """
+
+    def decorator(view_method):
+        ENDPOINTS.append(endpoint)
+
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            key = _request_key(request, endpoint, kwargs)
+            etag = _etag(key)
+            if _is_not_modified(request, etag):
+                _count("not_modified", endpoint)
+                return Response(status=304, headers=_conditional_headers(etag))
+
+            data = cache.get(key)
+            if data is not None:
+                _count("hits", endpoint)
+                return Response(
+                    data, headers={"X-Cache": "HIT", **_conditional_headers(etag)}
+                )
+
+            _count("misses", endpoint)
+            response = view_method(self, request, *args, **kwargs)
+            if isinstance(response, Response) and response.status_code == 200:
+                cache.set(key, response.data, settings.ANALYTICS_CACHE_TIMEOUT)
+                response["X-Cache"] = "MISS"
+                for header, value in _conditional_headers(etag).items():
+                    response[header] = value
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def async_cached_response(endpoint):
+    """
+    cached_response for the async views of async_views.py. Shares keys and
+    counters with the viewset method cached under the same endpoint name.
+    """
+
+    def decorator(view):
+        if endpoint not in ENDPOINTS:
+            ENDPOINTS.append(endpoint)
+
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            version = await UserDataState.aget_cache_version(request.user)
+            key = cache_key(
+                request.user.id, endpoint, version, request.query_params, kwargs
+            )
+            etag = _etag(key)
+            if _is_not_modified(request, etag):
+                await _acount("not_modified", endpoint)
+                return Response(status=304, headers=_conditional_headers(etag))
+
+            data = await cache.aget(key)
+            if data is not None:
+                await _acount("hits", endpoint)
+                return Response(
+                    data, headers={"X-Cache": "HIT", **_conditional_headers(etag)}
+                )
+
+            await _acount("misses", endpoint)
+            response = await view(request, *args, **kwargs)
+            if isinstance(response, Response) and response.status_code == 200:
+                await cache.aset(key, response.data, settings.ANALYTICS_CACHE_TIMEOUT)
+                response["X-Cache"] = "MISS"
+                for header, value in _conditional_headers(etag).items():
+                    response[header] = value
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def conditional_response(endpoint):
+    """
+    Add a version-derived ETag to successful responses of a viewset method
+    and answer a matching If-None-Match with 304 before the method runs.
+    For cheap endpoints whose data is not worth caching server side.
+    """
+
+    def decorator(view_method):
+        ENDPOINTS.append(endpoint)
+
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            etag = _etag(_request_key(request, endpoint, kwargs))
+            if _is_not_modified(request, etag):
+                _count("not_modified", endpoint)
+                return Response(status=304, headers=_conditional_headers(etag))
+
+            _count("misses", endpoint)
+            response = view_method(self, request, *args, **kwargs)
+            if isinstance(response, Response) and response.status_code == 200:
+                for header, value in _conditional_headers(etag).items():
+                    response[header] = value
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def cache_stats():
+    """
+    Return {endpoint: {"hits": n, "misses": n, "not_modified": n}} for every
+    cached or conditional endpoint
+    """
+    keys = {
+        (endpoint, outcome): f"{KEY_PREFIX}:stats:{endpoint}:{outcome}"
+        for endpoint in ENDPOINTS
+        for outcome in OUTCOMES
+    }
+    counts = cache.get_many(list(keys.values()))
+    return {
+        endpoint: {
+            outcome: counts.get(keys[endpoint, outcome], 0) for outcome in OUTCOMES
+        }
+        for endpoint in ENDPOINTS
+    }
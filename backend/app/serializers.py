@@ -48,9 +48,13 @@ class HabitSerializer(serializers.ModelSerializer):
             "max_value",
             "today_value",
             "archived",
+            "order",
         ]
 
     def get_today_value(self, obj):
+        # Use the value annotated by HabitViewSet.get_queryset when present
+        if hasattr(obj, "context_value"):
+            return float(obj.context_value) if obj.context_value is not None else 0
         # Get the date from context (passed by the viewset)
         target_date = self.context.get("date", date.today())
         completion = obj.completions.filter(date=target_date).first()
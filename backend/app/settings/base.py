@@ -41,6 +41,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so that its timings include the other middleware
+    "app.metrics.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -127,7 +129,7 @@ SITE_ID = 1
 # REST settings
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "app.authentication.CachedJWTAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
@@ -176,3 +178,38 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
 # CORS - to be configured in environment-specific settings
 CORS_ALLOWED_ORIGINS = []
+
+# Cache backend, also used for per-user analytics responses (app/response_cache.py)
+# and the stamps that invalidate per-worker copies of users and SiteSettings.
+# Local memory by default; use e.g. django.core.cache.backends.redis.RedisCache
+# with CACHE_LOCATION=redis://host:6379 to share it between processes, as
+# docker-compose does. Without a shared cache, SiteSettings changes reach the
+# other workers only after SITE_SETTINGS_TTL seconds.
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
+    }
+}
+
+# Seconds a cached analytics response is kept; writes invalidate it sooner
+ANALYTICS_CACHE_TIMEOUT = int(os.getenv("ANALYTICS_CACHE_TIMEOUT", "3600"))
+
+# Seconds each worker reuses a user loaded by CachedJWTAuthentication.
+# Saving or deleting the user invalidates it on every worker through the
+# cache; with a process-local CACHE_BACKEND users are not reused at all.
+JWT_USER_CACHE_TTL = int(os.getenv("JWT_USER_CACHE_TTL", "60"))
+
+# Seconds each worker buffers request metrics before adding them to the
+# shared counters read by api/metrics/
+METRICS_FLUSH_INTERVAL = int(os.getenv("METRICS_FLUSH_INTERVAL", "10"))
+
+# Add Server-Timing headers (query count and timings) to every response,
+# including anonymous ones; development settings turn this on
+METRICS_SERVER_TIMING = os.getenv("METRICS_SERVER_TIMING", "False") == "True"
+
+# Serve the analytics endpoints from app/async_views.py; only useful when
+# running under an ASGI server (see GUNICORN_WORKER_CLASS in entrypoint.sh)
+ASYNC_ANALYTICS = os.getenv("ASYNC_ANALYTICS", "False") == "True"
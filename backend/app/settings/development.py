@@ -12,6 +12,9 @@ DEBUG = True
 
 ALLOWED_HOSTS = ["localhost", "127.0.0.1", "*"]
 
+# Request timings in the browser dev tools (see app/metrics.py)
+METRICS_SERVER_TIMING = True
+
 # Database - SQLite for development
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
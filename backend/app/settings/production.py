@@ -26,9 +26,38 @@ DATABASES = {
         "PASSWORD": os.getenv("DB_PASSWORD"),
         "HOST": os.getenv("DB_HOST", "localhost"),
         "PORT": os.getenv("DB_PORT", "5432"),
+        # Check a reused connection before the first query of each request
+        "CONN_HEALTH_CHECKS": os.getenv("DB_CONN_HEALTH_CHECKS", "True") == "True",
     }
 }
 
+# Connection reuse. A sync gunicorn worker serves one request at a time, so
+# by default each worker keeps one persistent connection for DB_CONN_MAX_AGE
+# seconds. With DB_POOL=True each worker process gets a psycopg pool instead
+# (useful with GUNICORN_THREADS > 1), sized to one connection per thread;
+# the server then sees at most workers * DB_POOL_MAX_SIZE connections.
+if os.getenv("DB_POOL", "False") == "True":
+    from psycopg_pool import ConnectionPool
+
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "1")),
+            "max_size": int(
+                os.getenv("DB_POOL_MAX_SIZE", os.getenv("GUNICORN_THREADS", "1"))
+            ),
+            "timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+            "check": ConnectionPool.check_connection,
+        }
+    }
+    # Pooled connections are returned to the pool, not kept open by Django
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+elif ASYNC_ANALYTICS:
+    # ASGI requests run in their own thread contexts and could not reuse a
+    # persistent connection, so it would only be left open
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+else:
+    DATABASES["default"]["CONN_MAX_AGE"] = int(os.getenv("DB_CONN_MAX_AGE", "60"))
+
 # Security settings
 SECURE_SSL_REDIRECT = os.getenv("SECURE_SSL_REDIRECT", "False") == "True"
 SECURE_PROXY_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
@@ -0,0 +1,283 @@
+import base64
+import json
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .management.commands.compute_correlations import dtw, dtw_matrix
+from .models import (
+    Category,
+    Completion,
+    Habit,
+    HabitCorrelation,
+    Tag,
+    UserDataState,
+)
+
+
+class HabitListQueryCountTests(TestCase):
+    """GET /api/habits/ runs the same queries whatever the number of habits"""
+
+    def setUp(self):
+        self.user = User.objects.create_user("owner", "owner@example.com", "pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        # Created by the first analytics request; measure later ones
+        UserDataState.get_cache_version(self.user)
+
+    def create_habits(self, count):
+        category = Category.objects.create(name="Health", user=self.user)
+        tags = [Tag.objects.create(name=name, user=self.user) for name in ("am", "pm")]
+        habits = Habit.objects.bulk_create(
+            Habit(
+                name=f"Habit {number}",
+                user=self.user,
+                category=category if number % 2 else None,
+            )
+            for number in range(count)
+        )
+        Habit.tags.through.objects.bulk_create(
+            Habit.tags.through(habit_id=habit.id, tag_id=tag.id)
+            for habit in habits
+            for tag in tags
+        )
+        Completion.objects.bulk_create(
+            Completion(habit=habit, user=self.user, date=date.today(), value=1)
+            for habit in habits[::3]
+        )
+
+    def assert_list_queries(self, habit_count):
+        self.create_habits(habit_count)
+        # Response cache lookup, habits with context values, tags
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/habits/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), habit_count)
+        self.assertEqual(response.data[0]["today_value"], 1)
+        self.assertEqual(len(response.data[0]["tags"]), 2)
+
+    def test_five_habits(self):
+        self.assert_list_queries(5)
+
+    def test_five_hundred_habits(self):
+        self.assert_list_queries(500)
+
+
+class CursorValidationTests(TestCase):
+    """Cursors that decode but hold values of the wrong type are rejected"""
+
+    def setUp(self):
+        self.user = User.objects.create_user("owner", "owner@example.com", "pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.habit = Habit.objects.create(name="Walk", user=self.user)
+
+    def get_with_cursor(self, path, position):
+        cursor = base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+        return self.client.get(path, {"cursor": cursor})
+
+    def test_history_cursor_with_invalid_date(self):
+        path = f"/api/habits/{self.habit.id}/history/"
+        for position in (["notadate"], [None], [{}]):
+            self.assertEqual(self.get_with_cursor(path, position).status_code, 404)
+        self.assertEqual(self.get_with_cursor(path, ["2024-01-01"]).status_code, 200)
+
+    def test_habit_list_cursor_with_invalid_values(self):
+        for position in (["x", "Walk", 1], [0, "Walk", None], [[0], "Walk", 1]):
+            response = self.get_with_cursor("/api/habits/", position)
+            self.assertEqual(response.status_code, 404)
+
+
+class DTWTests(TestCase):
+    """compute_correlations --dtw scores DTW on the same scale as |r|"""
+
+    def test_independent_habits_are_not_similar(self):
+        user = User.objects.create_user("owner", "owner@example.com", "pw")
+        rng = np.random.default_rng(0)
+        first = rng.integers(1, 6, 61)
+        values = {
+            "Independent": rng.integers(1, 6, 61),
+            # The first habit one day later
+            "Shifted": np.roll(first, 1),
+            "First": first,
+        }
+        end_date = timezone.now().date() - timedelta(days=1)
+        habits = {}
+        for name, series in values.items():
+            habits[name] = Habit.objects.create(
+                name=name, user=user, habit_type="rating", max_value=5
+            )
+            Completion.objects.bulk_create(
+                Completion(
+                    habit=habits[name],
+                    user=user,
+                    date=end_date - timedelta(days=offset),
+                    value=int(value),
+                )
+                for offset, value in enumerate(series[:60])
+            )
+
+        call_command(
+            "compute_correlations",
+            user_id=user.id,
+            days=60,
+            full=True,
+            dtw=True,
+            stdout=StringIO(),
+        )
+
+        def correlation(name1, name2):
+            return HabitCorrelation.objects.get(
+                habit1__in=[habits[name1], habits[name2]],
+                habit2__in=[habits[name1], habits[name2]],
+            )
+
+        for name in ("First", "Shifted"):
+            unrelated = correlation("Independent", name)
+            self.assertLess(unrelated.max_correlation, 0.5)
+            if unrelated.dtw_distance is not None:
+                self.assertGreater(unrelated.dtw_distance, 0.5)
+        # Pearson misses the one day shift, DTW does not
+        shifted = correlation("First", "Shifted")
+        self.assertLess(abs(shifted.pearson_coefficient), 0.5)
+        self.assertGreaterEqual(shifted.max_correlation, 0.9)
+
+    def test_lb_keogh_prunes_pairs(self):
+        rising = np.repeat([0.0, 1.0], 30)
+        series = np.array([rising, rising[::-1], rising])
+        thresholds = np.full((3, 3), 0.5)
+
+        with mock.patch.object(
+            dtw, "distance_matrix_fast", wraps=dtw.distance_matrix_fast
+        ) as distance_matrix:
+            distances = dtw_matrix(series, thresholds, window=3, time_budget=10)
+
+        # Only the row of the identical pair is sent to DTW
+        self.assertEqual(distances[0, 2], 0)
+        self.assertTrue(np.isnan(distances[0, 1]))
+        self.assertTrue(np.isnan(distances[1, 2]))
+        self.assertEqual(
+            [call.kwargs["block"][0] for call in distance_matrix.call_args_list],
+            [(0, 1), (0, 1)],
+        )
+
+        with mock.patch.object(dtw, "distance_matrix_fast") as distance_matrix:
+            distances = dtw_matrix(series[:2], thresholds[:2, :2], 3, 10)
+        distance_matrix.assert_not_called()
+        self.assertTrue(np.isnan(distances).all())
+
+
+class HabitDataChangeTests(TestCase):
+    """Only habit edits that change which completions count mark data changed"""
+
+    def setUp(self):
+        self.user = User.objects.create_user("owner", "owner@example.com", "pw")
+        UserDataState.get_cache_version(self.user)
+        self.habit = Habit.objects.get(
+            pk=Habit.objects.create(name="Walk", user=self.user).pk
+        )
+        # As a correlation run leaves it
+        UserDataState.objects.filter(user=self.user).update(
+            correlations_dirty_from=None
+        )
+
+    def versions(self):
+        state = UserDataState.objects.get(user=self.user)
+        return state.data_version, state.cache_version
+
+    def test_rename_and_reorder_only_bump_cache_version(self):
+        data_version, cache_version = self.versions()
+        self.habit.name = "Run"
+        self.habit.color = "#E5484D"
+        self.habit.order = 3
+        self.habit.save()
+        self.assertEqual(self.versions(), (data_version, cache_version + 1))
+        self.assertIsNone(
+            UserDataState.objects.get(user=self.user).correlations_dirty_from
+        )
+
+    def test_archive_records_data_change(self):
+        for archived in (True, False):
+            data_version, _ = self.versions()
+            self.habit.archived = archived
+            self.habit.save()
+            self.assertEqual(self.versions()[0], data_version + 1)
+
+
+class RollingCorrelationTests(TestCase):
+    """compute_correlations --rolling survives cosmetic habit edits"""
+
+    def setUp(self):
+        self.user = User.objects.create_user("owner", "owner@example.com", "pw")
+        rng = np.random.default_rng(0)
+        today = timezone.now().date()
+        self.habits = [
+            Habit.objects.create(name=f"Habit {number}", user=self.user)
+            for number in range(3)
+        ]
+        Completion.objects.bulk_create(
+            Completion(
+                habit=habit,
+                user=self.user,
+                date=today - timedelta(days=offset),
+                value=1,
+            )
+            for habit in self.habits
+            for offset in range(1, 12)
+            if rng.random() < 0.6
+        )
+        # Last night's run, one day earlier
+        now = timezone.now()
+        with mock.patch.object(timezone, "now", return_value=now - timedelta(days=1)):
+            self.run_rolling()
+
+    def run_rolling(self):
+        """Run --rolling; return whether it fell back to a full recompute"""
+        command = "app.management.commands.compute_correlations.Command"
+        with mock.patch(
+            f"{command}.compute_user_correlations",
+            autospec=True,
+            return_value=0,
+        ) as compute_user_correlations:
+            call_command(
+                "compute_correlations",
+                user_id=self.user.id,
+                rolling=True,
+                stdout=StringIO(),
+            )
+        return compute_user_correlations.called
+
+    def test_rename_keeps_the_rolled_path(self):
+        self.habits[0].name = "Renamed"
+        self.habits[0].save()
+        self.assertFalse(self.run_rolling())
+        self.assertEqual(HabitCorrelation.objects.filter(user=self.user).count(), 3)
+
+    def test_archive_forces_full_recompute(self):
+        self.habits[0].archived = True
+        self.habits[0].save()
+        self.assertTrue(self.run_rolling())
+
+
+class ServerTimingTests(TestCase):
+    """Server-Timing is opt-in; the histograms record every request"""
+
+    @override_settings(METRICS_SERVER_TIMING=False)
+    def test_no_header_when_disabled(self):
+        with mock.patch("app.metrics.observe") as observe:
+            response = self.client.get("/api/habits/")
+        self.assertEqual(response.status_code, 401)
+        self.assertNotIn("Server-Timing", response)
+        observe.assert_called_once()
+
+    @override_settings(METRICS_SERVER_TIMING=True)
+    def test_header_when_enabled(self):
+        response = self.client.get("/api/habits/")
+        self.assertIn('desc="', response["Server-Timing"])
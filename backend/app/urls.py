@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
@@ -7,6 +8,7 @@ from .views import (
     CategoryViewSet,
     HabitCorrelationViewSet,
     UserInfoView,
+    metrics,
     SiteSettingsViewSet,
     TagViewSet,
 )
@@ -24,6 +26,8 @@ urlpatterns = [
     path("admin/", admin.site.urls),
     # API routes (habits, categories, tags, correlations, etc.)
     path("api/", include(router.urls)),
+    # Request timings and cache counters for Prometheus (staff only)
+    path("api/metrics/", metrics, name="metrics"),
     # User info endpoint
     path("api/auth/user/", UserInfoView.as_view(), name="user-info"),
     # Authentication routes
@@ -32,3 +36,17 @@ urlpatterns = [
     path("api/auth/registration/", CustomRegisterView.as_view(), name="rest_register"),
     path("api/auth/registration/", include("dj_rest_auth.registration.urls")),
 ]
+
+if settings.ASYNC_ANALYTICS:
+    from . import async_views
+
+    # Served ahead of the matching viewset actions; needs an ASGI server
+    urlpatterns = [
+        path("api/habits/graph_data/", async_views.graph_data, name="habit-graph-data"),
+        path("api/habits/summary/", async_views.summary, name="habit-summary"),
+        path("api/habits/date_range/", async_views.date_range, name="habit-date-range"),
+        path("api/habits/export_csv/", async_views.export_csv, name="habit-export-csv"),
+        path(
+            "api/correlations/", async_views.correlation_list, name="correlation-list"
+        ),
+    ] + urlpatterns
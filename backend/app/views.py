@@ -10,11 +10,92 @@ from .serializers import (
     HabitCorrelationSerializer,
     TagSerializer,
 )
+import csv
+from collections import defaultdict
 from datetime import date, datetime, timedelta
-from .models import Habit, Completion, Category, SiteSettings, Tag
-from django.db.models import Q
-from rest_framework.decorators import api_view, permission_classes
-from .models import HabitCorrelation
+from io import StringIO
+from .models import (
+    Habit,
+    Completion,
+    CompletionRollup,
+    Category,
+    SiteSettings,
+    Tag,
+    UserDataState,
+)
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import (
+    Avg,
+    Count,
+    DecimalField,
+    Max,
+    Min,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+)
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.http import parse_etags
+from rest_framework.authentication import BasicAuthentication
+from rest_framework.decorators import (
+    api_view,
+    authentication_classes,
+    permission_classes,
+)
+from .models import HabitCorrelation, SITE_SETTINGS_TTL
+from .pagination import (
+    CompletionHistoryPagination,
+    CorrelationPagination,
+    HabitPagination,
+)
+from .authentication import CachedJWTAuthentication
+from .metrics import PROMETHEUS_CONTENT_TYPE, flush, render_metrics
+from .response_cache import cache_stats, cached_response, conditional_response
+
+# Rows fetched per round trip when streaming completions for export_csv
+EXPORT_CHUNK_SIZE = 2000
+
+# Maximum number of entries accepted by HabitViewSet.bulk_complete
+BULK_COMPLETE_MAX_ITEMS = 1000
+
+# Accepted values of the granularity param of graph_data and summary
+GRANULARITIES = ("day", "week", "month")
+
+
+class _Echo:
+    """File-like object whose write() returns the value, for streaming csv.writer output."""
+
+    def write(self, value):
+        return value
+
+
+def _apply_layout(queryset, layout_data, user):
+    """
+    Apply a [{"id": ..., "order": ...}, ...] layout to the rows of queryset.
+
+    Ownership is checked with one fetch and the new orders are written with a
+    single bulk_update inside a transaction, so a layout is applied entirely
+    or not at all. Ids outside queryset are ignored.
+    """
+    if not isinstance(layout_data, list):
+        return Response({"error": "layout must be a list"}, status=400)
+    try:
+        orders = {int(item["id"]): int(item.get("order", 0)) for item in layout_data}
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return Response(
+            {"error": "Each layout item needs an integer id and order"}, status=400
+        )
+
+    with transaction.atomic():
+        rows = list(queryset.filter(id__in=orders).select_for_update().only("id"))
+        for row in rows:
+            row.order = orders[row.id]
+        queryset.model.objects.bulk_update(rows, ["order"])
+    UserDataState.record_cache_change(user.id)
+
+    return Response({"status": "layout updated"})
 
 
 class CategoryViewSet(viewsets.ModelViewSet):
@@ -25,23 +106,19 @@ class CategoryViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return self.queryset.filter(user=self.request.user).order_by("order", "name")
 
+    @conditional_response("categories.list")
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
     @action(detail=False, methods=["post"])
     def update_layout(self, request):
         """Update the order of categories"""
-        layout_data = request.data.get("layout", [])
-
-        for item in layout_data:
-            try:
-                category = Category.objects.get(id=item["id"], user=request.user)
-                category.order = item.get("order", 0)
-                category.save()
-            except Category.DoesNotExist:
-                pass
-
-        return Response({"status": "layout updated"})
+        return _apply_layout(
+            self.get_queryset(), request.data.get("layout", []), request.user
+        )
 
 
 class TagViewSet(viewsets.ModelViewSet):
@@ -52,6 +129,10 @@ class TagViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return self.queryset.filter(user=self.request.user).order_by("name")
 
+    @conditional_response("tags.list")
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
@@ -59,10 +140,12 @@ class TagViewSet(viewsets.ModelViewSet):
 class HabitViewSet(viewsets.ModelViewSet):
     serializer_class = HabitSerializer
     permission_classes = [IsAuthenticated]
+    # Opt-in: habits/?page_size=N or ?cursor=... returns {next, results}
+    pagination_class = HabitPagination
     # Add queryset attribute for the router
     queryset = Habit.objects.all()
 
-    def get_queryset(self):
+    def _get_user_habits(self):
         # Only return habits for the authenticated user
         queryset = self.queryset.filter(user=self.request.user)
         # Filter by archived status if specified, default to non-archived
@@ -74,23 +157,56 @@ class HabitViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(archived=False)
         return queryset
 
-    def get_serializer_context(self):
-        """Pass the requested date to the serializer"""
-        context = super().get_serializer_context()
-        # Get date from query params, default to today
+    def get_queryset(self):
+        queryset = self._get_user_habits()
+        if self.action not in ("list", "retrieve"):
+            # Actions such as complete only need the habit row
+            return queryset
+        # Load the context date's value, category and tags up front so
+        # serializing H habits costs a constant number of queries
+        context_value = Completion.objects.filter(
+            habit=OuterRef("pk"), date=self._get_context_date()
+        ).values("value")[:1]
+        return (
+            queryset.select_related("category")
+            .prefetch_related("tags")
+            .annotate(
+                context_value=Subquery(
+                    context_value,
+                    output_field=DecimalField(max_digits=10, decimal_places=2),
+                )
+            )
+        )
+
+    def _get_context_date(self):
+        """Parse the date query param, default to today"""
         date_str = self.request.query_params.get("date")
         if date_str:
             try:
-                context["date"] = datetime.strptime(date_str, "%Y-%m-%d").date()
+                return datetime.strptime(date_str, "%Y-%m-%d").date()
             except ValueError:
-                context["date"] = date.today()
-        else:
-            context["date"] = date.today()
+                pass
+        return date.today()
+
+    def get_serializer_context(self):
+        """Pass the requested date to the serializer"""
+        context = super().get_serializer_context()
+        context["date"] = self._get_context_date()
         return context
 
+    @conditional_response("habits.list")
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         # Automatically set the user when creating a habit
         serializer.save(user=self.request.user)
+        # Tags are set after Habit.save, so bump again once they are in place
+        UserDataState.record_cache_change(self.request.user.id)
+
+    def perform_update(self, serializer):
+        serializer.save()
+        UserDataState.record_cache_change(self.request.user.id)
 
     @action(detail=True, methods=["post"])
     def complete(self, request, pk=None):
@@ -125,6 +241,179 @@ class HabitViewSet(viewsets.ModelViewSet):
             }
         )
 
+    @action(detail=True, methods=["get"])
+    @conditional_response("habits.history")
+    def history(self, request, pk=None):
+        """
+        Page through a habit's completions, newest first.
+
+        Query Parameters:
+        - page_size: Completions per page (default: 100, max: 1000)
+        - cursor: The `next` cursor of the previous page
+
+        Returns { next, results: [{ date, value }] }
+        """
+        habit = self.get_object()
+        paginator = CompletionHistoryPagination()
+        page = paginator.paginate_queryset(
+            Completion.objects.filter(habit=habit).only("date", "value"),
+            request,
+            view=self,
+        )
+        return paginator.get_paginated_response(
+            [
+                {"date": completion.date.isoformat(), "value": float(completion.value)}
+                for completion in page
+            ]
+        )
+
+    @action(detail=False, methods=["post"])
+    def update_layout(self, request):
+        """Update the order of habits within their categories"""
+        return _apply_layout(
+            Habit.objects.filter(user=request.user),
+            request.data.get("layout", []),
+            request.user,
+        )
+
+    @action(detail=False, methods=["post"])
+    def bulk_complete(self, request):
+        """
+        Create or update many completions in one request (offline sync, backfill).
+
+        Body: {"completions": [{"habit_id": 1, "date": "YYYY-MM-DD", "value": 1}, ...]}
+        "date" defaults to today and "value" to 1, as in complete.
+
+        All valid entries are written with a single
+        INSERT ... ON CONFLICT (habit_id, date) DO UPDATE statement.
+        Returns one result per entry, in request order.
+        """
+        entries = request.data.get("completions")
+        if not isinstance(entries, list):
+            return Response({"error": "completions must be a list"}, status=400)
+        if len(entries) > BULK_COMPLETE_MAX_ITEMS:
+            return Response(
+                {"error": f"At most {BULK_COMPLETE_MAX_ITEMS} completions per request"},
+                status=400,
+            )
+
+        value_field = Completion._meta.get_field("value")
+        results = [None] * len(entries)
+        # (habit_id, date) -> index of the entry that wins; later entries win
+        pending = {}
+        for index, entry in enumerate(entries):
+            if not isinstance(entry, dict):
+                results[index] = {"status": "error", "error": "Invalid entry"}
+                continue
+            try:
+                habit_id = int(entry.get("habit_id"))
+            except (TypeError, ValueError):
+                results[index] = {"status": "error", "error": "habit_id is required"}
+                continue
+            try:
+                completion_date = (
+                    datetime.strptime(entry["date"], "%Y-%m-%d").date()
+                    if entry.get("date")
+                    else date.today()
+                )
+            except (TypeError, ValueError):
+                results[index] = {
+                    "habit_id": habit_id,
+                    "status": "error",
+                    "error": "Invalid date format. Use YYYY-MM-DD",
+                }
+                continue
+            try:
+                value = value_field.clean(entry.get("value", 1), None)
+            except ValidationError as error:
+                results[index] = {
+                    "habit_id": habit_id,
+                    "date": completion_date.isoformat(),
+                    "status": "error",
+                    "error": " ".join(error.messages),
+                }
+                continue
+
+            key = (habit_id, completion_date)
+            if key in pending:
+                results[pending[key][0]] = {
+                    "habit_id": habit_id,
+                    "date": completion_date.isoformat(),
+                    "status": "superseded",
+                }
+            pending[key] = (index, value)
+
+        # Ownership check for every referenced habit in one query
+        owned_ids = set(
+            self._get_user_habits()
+            .filter(id__in={habit_id for habit_id, _ in pending})
+            .values_list("id", flat=True)
+        )
+        # Existing rows, to report created vs updated
+        existing = set(
+            Completion.objects.filter(
+                user=request.user,
+                habit_id__in=owned_ids,
+                date__in={completion_date for _, completion_date in pending},
+            ).values_list("habit_id", "date")
+        )
+
+        to_write = []
+        for (habit_id, completion_date), (index, value) in pending.items():
+            if habit_id not in owned_ids:
+                results[index] = {
+                    "habit_id": habit_id,
+                    "date": completion_date.isoformat(),
+                    "status": "error",
+                    "error": "Habit not found",
+                }
+                continue
+            to_write.append(
+                Completion(
+                    habit_id=habit_id,
+                    user_id=request.user.id,
+                    date=completion_date,
+                    value=value,
+                )
+            )
+            results[index] = {
+                "habit_id": habit_id,
+                "date": completion_date.isoformat(),
+                "status": (
+                    "updated" if (habit_id, completion_date) in existing else "created"
+                ),
+                "new_value": float(value),
+            }
+
+        if to_write:
+            # Commit the completions only together with their rollups
+            with transaction.atomic():
+                Completion.objects.bulk_create(
+                    to_write,
+                    update_conflicts=True,
+                    unique_fields=["habit", "date"],
+                    update_fields=["value"],
+                )
+                # bulk_create skips Completion.save, so record the write here
+                written_dates = [completion.date for completion in to_write]
+                CompletionRollup.refresh(
+                    {completion.habit_id for completion in to_write},
+                    min(written_dates),
+                    max(written_dates),
+                )
+                UserDataState.record_completion_write(
+                    request.user.id, min(written_dates), max(written_dates)
+                )
+
+        return Response(
+            {
+                "results": results,
+                "created": sum(r["status"] == "created" for r in results),
+                "updated": sum(r["status"] == "updated" for r in results),
+                "errors": sum(r["status"] == "error" for r in results),
+            }
+        )
+
     @action(detail=True, methods=["post"])
     def archive(self, request, pk=None):
         """Archive a habit."""
@@ -160,10 +449,18 @@ class HabitViewSet(viewsets.ModelViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=False, methods=["get"])
+    @cached_response("habits.graph_data")
     def graph_data(self, request):
         """
         Get habit completion data for graphing within a date range.
         Returns data grouped by habit type.
+
+        Query Parameters:
+        - start_date, end_date: Range to graph (YYYY-MM-DD)
+        - layout: "columnar" for a shared date axis with one value array per habit
+        - granularity: "day" (default), "week" or "month". Week and month
+          points are dated by the bucket's first day; their value is the sum
+          of positive values, or the mean for rating habits.
         """
         start_date_str = request.query_params.get("start_date")
         end_date_str = request.query_params.get("end_date")
@@ -181,47 +478,195 @@ class HabitViewSet(viewsets.ModelViewSet):
                 {"error": "Invalid date format. Use YYYY-MM-DD"}, status=400
             )
 
+        granularity = request.query_params.get("granularity", "day")
+        if granularity not in GRANULARITIES:
+            return Response(
+                {"error": "granularity must be one of: day, week, month"}, status=400
+            )
+
         # Get all habits for the user
-        habits = self.get_queryset()
+        habits = self._get_user_habits()
+
+        if granularity != "day":
+            result = self._build_bucketed_graph_data(
+                habits, start_date, end_date, granularity
+            )
+            result["granularity"] = granularity
+            return Response(result)
+
+        # Fetch every completion in the range in one ordered pass and group
+        # the points by habit in memory
+        completions = (
+            Completion.objects.filter(
+                user=request.user,
+                habit__in=habits,
+                date__gte=start_date,
+                date__lte=end_date,
+            )
+            .order_by("habit_id", "date")
+            .values_list("habit_id", "date", "value")
+        )
+        points_by_habit = defaultdict(list)
+        for habit_id, completion_date, value in completions:
+            points_by_habit[habit_id].append((completion_date, float(value)))
+
+        return Response(self._build_graph_data(habits, points_by_habit))
+
+    def _build_bucketed_graph_data(self, habits, start_date, end_date, granularity):
+        """Build graph_data from weekly or monthly buckets instead of days"""
+        habit_types = {habit.id: habit.habit_type for habit in habits}
+        stats = self._bucket_stats(habits, start_date, end_date, granularity)
+        points_by_habit = {
+            habit_id: [
+                (
+                    period_start,
+                    float(
+                        total / count if habit_types[habit_id] == "rating" else total
+                    ),
+                )
+                for period_start, (count, total, _, _) in sorted(buckets.items())
+            ]
+            for habit_id, buckets in stats.items()
+        }
+        return self._build_graph_data(habits, points_by_habit)
+
+    def _build_graph_data(self, habits, points_by_habit):
+        """Build the graph_data response from { habit_id: [(date, value)] }"""
+        if self.request.query_params.get("layout") == "columnar":
+            return self._build_columnar_graph_data(habits, points_by_habit)
 
         # Structure: { habit_type: [{ habit_name, habit_id, color, data: [{ date, value }] }] }
         result = {"boolean": [], "counter": [], "value": [], "rating": []}
 
         for habit in habits:
-            # Get completions for this habit in the date range
-            completions = Completion.objects.filter(
-                habit=habit, date__gte=start_date, date__lte=end_date
-            ).order_by("date")
-
-            # Build data points
-            data_points = []
-            for completion in completions:
-                data_points.append(
-                    {
-                        "date": completion.date.isoformat(),
-                        "value": float(completion.value),
-                    }
-                )
-
             # Only include habits that have data
-            if data_points:
-                habit_data = {
+            points = points_by_habit.get(habit.id)
+            if not points:
+                continue
+
+            habit_data = {
+                "habit_id": habit.id,
+                "habit_name": habit.name,
+                "color": habit.color,
+                "data": [
+                    {"date": point_date.isoformat(), "value": value}
+                    for point_date, value in points
+                ],
+            }
+
+            result[habit.habit_type].append(habit_data)
+
+        return result
+
+    def _bucket_stats(self, habits, start_date, end_date, granularity):
+        """
+        Aggregate the habits' positive completions between start_date and
+        end_date into weekly or monthly buckets.
+
+        Buckets lying wholly inside the range are read from CompletionRollup;
+        the partial buckets at either edge are aggregated from completions.
+        Returns { habit_id: { period_start: (count, total, min, max) } }.
+        """
+        one_day = timedelta(days=1)
+        whole_start = CompletionRollup.period_start_of(granularity, start_date)
+        if whole_start < start_date:
+            whole_start = (
+                CompletionRollup.period_end_of(granularity, start_date) + one_day
+            )
+        whole_end = CompletionRollup.period_end_of(granularity, end_date)
+        if whole_end > end_date:
+            whole_end = (
+                CompletionRollup.period_start_of(granularity, end_date) - one_day
+            )
+
+        stats = defaultdict(dict)
+        edges = Q()
+        if whole_start <= whole_end:
+            rollups = CompletionRollup.objects.filter(
+                habit__in=habits,
+                granularity=granularity,
+                period_start__gte=whole_start,
+                period_start__lte=whole_end,
+            ).values_list("habit_id", "period_start", "count", "sum", "min", "max")
+            for habit_id, period_start, *bucket in rollups:
+                stats[habit_id][period_start] = tuple(bucket)
+            edges = Q(date__lt=whole_start) | Q(date__gt=whole_end)
+
+        partial_buckets = CompletionRollup.bucket_completions(
+            Completion.objects.filter(
+                edges,
+                user=self.request.user,
+                habit__in=habits,
+                date__gte=start_date,
+                date__lte=end_date,
+            ),
+            granularity,
+        )
+        for bucket in partial_buckets:
+            stats[bucket["habit_id"]][bucket["period_start"]] = (
+                bucket["count"],
+                bucket["sum"],
+                bucket["min"],
+                bucket["max"],
+            )
+        return stats
+
+    def _build_columnar_graph_data(self, habits, points_by_habit):
+        """
+        Build the columnar graph_data layout: one shared date axis and,
+        per habit, a dense value array aligned to it (null where no data).
+
+        Structure: { dates: [...], habit_type: [{ habit_name, habit_id, color, values: [...] }] }
+        """
+        dates = sorted(
+            {
+                point_date
+                for points in points_by_habit.values()
+                for point_date, _ in points
+            }
+        )
+        date_index = {point_date: i for i, point_date in enumerate(dates)}
+
+        result = {
+            "layout": "columnar",
+            "dates": [d.isoformat() for d in dates],
+            "boolean": [],
+            "counter": [],
+            "value": [],
+            "rating": [],
+        }
+
+        for habit in habits:
+            points = points_by_habit.get(habit.id)
+            if not points:
+                continue
+
+            values = [None] * len(dates)
+            for point_date, value in points:
+                values[date_index[point_date]] = value
+
+            result[habit.habit_type].append(
+                {
                     "habit_id": habit.id,
                     "habit_name": habit.name,
                     "color": habit.color,
-                    "data": data_points,
+                    "values": values,
                 }
+            )
 
-                result[habit.habit_type].append(habit_data)
-
-        return Response(result)
+        return result
 
     @action(detail=False, methods=["get"])
+    @cached_response("habits.export_csv")
     def export_csv(self, request):
         """
         Export habit completion data as CSV for a date range.
         Format: First column is habit name, subsequent columns are dates (one per day).
         Each row contains the values for that habit on each day.
+
+        Query Parameters:
+        - start_date, end_date: Range to export (YYYY-MM-DD)
+        - stream: "true" to stream a text/csv attachment instead of JSON
         """
         start_date_str = request.query_params.get("start_date")
         end_date_str = request.query_params.get("end_date")
@@ -239,81 +684,111 @@ class HabitViewSet(viewsets.ModelViewSet):
                 {"error": "Invalid date format. Use YYYY-MM-DD"}, status=400
             )
 
-        # Get all habits for the user
-        habits = self.get_queryset().order_by("name")
-
-        # Generate list of all dates in range
-        from datetime import timedelta
-
-        date_list = []
-        current_date = start_date
-        while current_date <= end_date:
-            date_list.append(current_date)
-            current_date += timedelta(days=1)
+        rows = self._iter_csv_rows(start_date, end_date)
 
-        # Build CSV content
-        import csv
-        from io import StringIO
+        if request.query_params.get("stream", "false").lower() == "true":
+            # Stream text/csv row by row so memory stays flat for long ranges
+            writer = csv.writer(_Echo())
+            response = StreamingHttpResponse(
+                (writer.writerow(row) for row in rows), content_type="text/csv"
+            )
+            response["Content-Disposition"] = (
+                f'attachment; filename="habit_data_{start_date_str}_to_{end_date_str}.csv"'
+            )
+            return response
 
         output = StringIO()
         writer = csv.writer(output)
+        writer.writerows(rows)
 
-        # Write header row (Habit Name, Date1, Date2, ...)
-        header = ["Habit Name"] + [d.strftime("%Y-%m-%d") for d in date_list]
-        writer.writerow(header)
+        csv_content = output.getvalue()
+        output.close()
 
-        # Write data rows
-        for habit in habits:
-            # Get all completions for this habit in the date range
-            completions = Completion.objects.filter(
-                habit=habit, date__gte=start_date, date__lte=end_date
-            ).order_by("date")
+        return Response({"csv_content": csv_content})
 
-            # Create a dictionary for quick lookup
-            completion_dict = {c.date: float(c.value) for c in completions}
+    def _iter_csv_rows(self, start_date, end_date):
+        """
+        Yield the export_csv rows: a header (Habit Name, Date1, Date2, ...)
+        followed by one row per habit, ordered by name.
 
-            # Build row: habit name followed by values for each date
-            row = [habit.name]
-            for date_item in date_list:
-                value = completion_dict.get(date_item, "")
-                row.append(value)
+        Completions are read in a single pass ordered like the habits, so
+        only one habit row is held in memory at a time.
+        """
+        # Get all habits for the user
+        habits = list(self._get_user_habits().order_by("name", "id"))
+        num_days = (end_date - start_date).days + 1
 
-            writer.writerow(row)
+        yield self._csv_header(start_date, num_days)
 
-        csv_content = output.getvalue()
-        output.close()
+        completions = self._export_completions(habits, start_date, end_date).iterator(
+            chunk_size=EXPORT_CHUNK_SIZE
+        )
+        pending = next(completions, None)
 
-        return Response({"csv_content": csv_content})
+        # Write data rows: habit name followed by values for each date
+        for habit in habits:
+            row = [habit.name] + [""] * num_days
+            while pending is not None and pending[0] == habit.id:
+                _, completion_date, value = pending
+                row[(completion_date - start_date).days + 1] = float(value)
+                pending = next(completions, None)
+            yield row
+
+    def _csv_header(self, start_date, num_days):
+        """Header row of export_csv: Habit Name, Date1, Date2, ..."""
+        return ["Habit Name"] + [
+            (start_date + timedelta(days=offset)).strftime("%Y-%m-%d")
+            for offset in range(num_days)
+        ]
+
+    def _export_completions(self, habits, start_date, end_date):
+        """(habit_id, date, value) of the export range, ordered like the habits"""
+        return (
+            Completion.objects.filter(
+                user=self.request.user,
+                habit__in=[habit.id for habit in habits],
+                date__gte=start_date,
+                date__lte=end_date,
+            )
+            .order_by("habit__name", "habit_id", "date")
+            .values_list("habit_id", "date", "value")
+        )
 
     @action(detail=False, methods=["get"])
+    @cached_response("habits.date_range")
     def date_range(self, request):
         """
         Get the minimum and maximum dates for all completions for the user's habits.
         Returns the date range of all available data.
         """
-        # Get all habits for the user
-        habits = self.get_queryset()
-
-        # Get all completions for these habits
-        completions = Completion.objects.filter(habit__in=habits).order_by("date")
+        params = request.query_params
+        if "include_archived" in params or "archived_only" in params:
+            # Only the default (non-archived) bounds are cached
+            bounds = Completion.objects.filter(
+                user=request.user, habit__in=self._get_user_habits()
+            ).aggregate(min_date=Min("date"), max_date=Max("date"))
+            min_date, max_date = bounds["min_date"], bounds["max_date"]
+        else:
+            min_date, max_date = UserDataState.get_completion_bounds(request.user)
 
-        if not completions.exists():
+        if min_date is None:
             return Response(
                 {"start_date": None, "end_date": None, "message": "No data available"}
             )
 
-        min_date = completions.first().date
-        max_date = completions.last().date
-
         return Response(
             {"start_date": min_date.isoformat(), "end_date": max_date.isoformat()}
         )
 
     @action(detail=False, methods=["get"])
+    @cached_response("habits.summary")
     def summary(self, request):
         """
         Get summary statistics for habits over a date range (default: last 7 days).
         Returns metrics grouped by habit type.
+
+        With granularity=week or month, totals are combined from weekly or
+        monthly rollups (same results, fewer rows read for long ranges).
         """
         start_date_str = request.query_params.get("start_date")
         end_date_str = request.query_params.get("end_date")
@@ -331,26 +806,55 @@ class HabitViewSet(viewsets.ModelViewSet):
                 {"error": "Invalid date format. Use YYYY-MM-DD"}, status=400
             )
 
-        # Get all habits for the user
-        habits = self.get_queryset()
+        # Get all habits for the user, with categories and tags loaded up front
+        habits = (
+            self._get_user_habits().select_related("category").prefetch_related("tags")
+        )
 
         # Calculate number of days in range
         days_in_range = (end_date - start_date).days + 1
 
+        granularity = request.query_params.get("granularity", "day")
+        if granularity not in GRANULARITIES:
+            return Response(
+                {"error": "granularity must be one of: day, week, month"}, status=400
+            )
+
+        if granularity != "day":
+            # Combine weekly or monthly buckets instead of scanning every day
+            stats_by_habit = {
+                habit_id: self._merge_buckets(buckets.values())
+                for habit_id, buckets in self._bucket_stats(
+                    habits, start_date, end_date, granularity
+                ).items()
+            }
+        else:
+            stats_by_habit = self._daily_stats(habits, start_date, end_date)
+
+        # Longest and current streaks for all boolean habits at once
+        streaks = self._calculate_streaks(
+            [habit for habit in habits if habit.habit_type == "boolean"],
+            start_date,
+            end_date,
+        )
+
+        return Response(
+            self._build_summary(habits, stats_by_habit, streaks, days_in_range)
+        )
+
+    def _build_summary(self, habits, stats_by_habit, streaks, days_in_range):
+        """Build the summary response from per-habit stats and streaks"""
         # Structure: { habit_type: [{ habit_name, color, metrics }] }
         result = {"boolean": [], "counter": [], "value": [], "rating": []}
 
         for habit in habits:
-            # Get completions for this habit in the date range
-            completions = Completion.objects.filter(
-                habit=habit, date__gte=start_date, date__lte=end_date, value__gt=0
-            )
-
-            completion_count = completions.count()
-
-            if completion_count == 0:
+            stats = stats_by_habit.get(habit.id)
+            if stats is None:
                 continue
 
+            completion_count = stats["count"]
+            total = float(stats["total"])
+
             # Calculate metrics based on habit type
             if habit.habit_type == "boolean":
                 # For boolean: completion rate
@@ -360,36 +864,34 @@ class HabitViewSet(viewsets.ModelViewSet):
                         (completion_count / days_in_range) * 100, 1
                     ),
                     "days_in_range": days_in_range,
-                    "streak": self._calculate_streak(habit, start_date, end_date),
+                    "streak": streaks[habit.id][0],
+                    "current_streak": streaks[habit.id][1],
                 }
             elif habit.habit_type == "counter":
                 # For counter: total, average, max
-                values = [float(c.value) for c in completions]
                 metrics = {
-                    "total": sum(values),
-                    "average": round(sum(values) / days_in_range, 1),
-                    "max": max(values),
+                    "total": total,
+                    "average": round(total / days_in_range, 1),
+                    "max": float(stats["max"]),
                     "days_tracked": completion_count,
                     "days_in_range": days_in_range,
                 }
             elif habit.habit_type == "value":
                 # For value: count, km, hour, etc.
-                values = [float(c.value) for c in completions]
                 metrics = {
-                    "total": round(sum(values), 1),
-                    "average": round(sum(values) / len(values), 1),
-                    "max_value": round(max(values), 1),
+                    "total": round(total, 1),
+                    "average": round(float(stats["average"]), 1),
+                    "max_value": round(float(stats["max"]), 1),
                     "days_tracked": completion_count,
                     "days_in_range": days_in_range,
                     "unit": habit.unit,
                 }
             elif habit.habit_type == "rating":
                 # For rating: average, distribution
-                values = [float(c.value) for c in completions]
                 metrics = {
-                    "average": round(sum(values) / len(values), 1),
-                    "max": int(max(values)),
-                    "min": int(min(values)),
+                    "average": round(float(stats["average"]), 1),
+                    "max": int(stats["max"]),
+                    "min": int(stats["min"]),
                     "days_tracked": completion_count,
                     "days_in_range": days_in_range,
                     "max_value": habit.max_value,
@@ -411,29 +913,134 @@ class HabitViewSet(viewsets.ModelViewSet):
                 }
             )
 
-        return Response(result)
-
-    def _calculate_streak(self, habit, start_date, end_date):
-        """Calculate current streak for a habit ending on end_date"""
-        current_date = start_date
-        streak = 0
-        max_streak = 0
-        while True:
-            completion = Completion.objects.filter(
-                habit=habit, date=current_date, value=1
-            ).first()
-
-            if completion:
-                streak += 1
-                max_streak = max(max_streak, streak)
-            else:
-                streak = 0
+        return result
 
-            current_date = current_date + timedelta(days=1)
-            if current_date > end_date:
-                break
+    def _daily_stats(self, habits, start_date, end_date):
+        """Aggregate every habit's positive completions in one grouped query"""
+        return {
+            row["habit_id"]: row
+            for row in self._daily_stats_queryset(habits, start_date, end_date)
+        }
 
-        return max_streak
+    def _daily_stats_queryset(self, habits, start_date, end_date):
+        return (
+            Completion.objects.filter(
+                user=self.request.user,
+                habit__in=habits,
+                date__gte=start_date,
+                date__lte=end_date,
+                value__gt=0,
+            )
+            .values("habit_id")
+            .annotate(
+                count=Count("value"),
+                total=Sum("value"),
+                average=Avg("value"),
+                max=Max("value"),
+                min=Min("value"),
+            )
+            .order_by()
+        )
+
+    def _merge_buckets(self, buckets):
+        """Combine (count, total, min, max) buckets into _daily_stats's row shape"""
+        counts, totals, minimums, maximums = zip(*buckets)
+        count, total = sum(counts), sum(totals)
+        return {
+            "count": count,
+            "total": total,
+            "average": total / count,
+            "max": max(maximums),
+            "min": min(minimums),
+        }
+
+    def _calculate_streaks(self, habits, start_date, end_date):
+        """
+        Calculate longest and current streaks of boolean completions
+        (value == 1) for several habits within a date range.
+
+        The current streak is the run of consecutive days ending on end_date.
+        Returns { habit_id: (longest_streak, current_streak) }.
+        """
+        habit_ids = [habit.id for habit in habits]
+        streaks = {habit_id: (0, 0) for habit_id in habit_ids}
+        if not habit_ids:
+            return streaks
+
+        if connection.vendor == "postgresql":
+            islands = self._streak_islands_sql(habit_ids, start_date, end_date)
+        else:
+            islands = self._streak_islands_scan(habit_ids, start_date, end_date)
+
+        for habit_id, length, last_date in islands:
+            longest, current = streaks[habit_id]
+            streaks[habit_id] = (
+                max(longest, length),
+                length if last_date == end_date else current,
+            )
+
+        return streaks
+
+    def _streak_islands_sql(self, habit_ids, start_date, end_date):
+        """
+        Yield (habit_id, length, last_date) for each run of consecutive
+        completed days using a gaps-and-islands window query: within a run,
+        date minus its row number is constant.
+        """
+        query = f"""
+            SELECT habit_id, COUNT(*), MAX(date)
+            FROM (
+                SELECT
+                    habit_id,
+                    date,
+                    date - CAST(
+                        ROW_NUMBER() OVER (PARTITION BY habit_id ORDER BY date)
+                        AS integer
+                    ) AS island
+                FROM {Completion._meta.db_table}
+                WHERE user_id = %s AND habit_id = ANY(%s)
+                    AND date >= %s AND date <= %s AND value = 1
+            ) AS completed_days
+            GROUP BY habit_id, island
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                query, [self.request.user.id, habit_ids, start_date, end_date]
+            )
+            yield from cursor.fetchall()
+
+    def _streak_islands_scan(self, habit_ids, start_date, end_date):
+        """
+        Yield (habit_id, length, last_date) for each run of consecutive
+        completed days with a single scan over the ordered completions.
+        """
+        completed_days = (
+            Completion.objects.filter(
+                user=self.request.user,
+                habit_id__in=habit_ids,
+                date__gte=start_date,
+                date__lte=end_date,
+                value=1,
+            )
+            .order_by("habit_id", "date")
+            .values_list("habit_id", "date")
+        )
+
+        run_habit_id, run_length, run_last_date = None, 0, None
+        for habit_id, completion_date in completed_days:
+            if (
+                habit_id == run_habit_id
+                and completion_date == run_last_date + timedelta(days=1)
+            ):
+                run_length += 1
+            else:
+                if run_habit_id is not None:
+                    yield run_habit_id, run_length, run_last_date
+                run_habit_id, run_length = habit_id, 1
+            run_last_date = completion_date
+
+        if run_habit_id is not None:
+            yield run_habit_id, run_length, run_last_date
 
 
 class UserInfoView(APIView):
@@ -499,7 +1106,7 @@ class SiteSettingsViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_403_FORBIDDEN,
                 )
 
-            settings = SiteSettings.get_settings()
+            settings = SiteSettings.get_settings(cached=False)
             serializer = self.get_serializer(settings, data=request.data, partial=True)
 
             if serializer.is_valid():
@@ -521,7 +1128,7 @@ class SiteSettingsViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=["post"])
     def update_settings(self, request):
         """Update the settings via custom action"""
-        settings = SiteSettings.get_settings()
+        settings = SiteSettings.get_settings(cached=False)
         serializer = self.get_serializer(settings, data=request.data, partial=True)
 
         if serializer.is_valid():
@@ -533,7 +1140,17 @@ class SiteSettingsViewSet(viewsets.ModelViewSet):
     def check_registration(self, request):
         """Public endpoint to check if registration is allowed - no authentication required"""
         settings = SiteSettings.get_settings()
-        return Response({"allow_registration": settings.allow_registration})
+        # Same answer for everyone, so browsers and proxies may reuse it
+        etag = f'"registration-{int(settings.allow_registration)}"'
+        headers = {
+            "ETag": etag,
+            "Cache-Control": f"public, max-age={SITE_SETTINGS_TTL}",
+        }
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(
+            {"allow_registration": settings.allow_registration}, headers=headers
+        )
 
 
 @api_view(["GET"])
@@ -699,6 +1316,21 @@ def habit_insights_summary(request):
     )
 
 
+@api_view(["GET"])
+@authentication_classes([CachedJWTAuthentication, BasicAuthentication])
+@permission_classes([IsAdminUser])
+def metrics(request):
+    """
+    Request timing histograms and analytics cache counters in the Prometheus
+    text format. Staff only; scrapers can use HTTP basic auth.
+    """
+    # Include this worker's latest requests
+    flush()
+    return HttpResponse(
+        render_metrics(cache_stats()), content_type=PROMETHEUS_CONTENT_TYPE
+    )
+
+
 class HabitCorrelationViewSet(viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for viewing habit correlations (insights).
@@ -712,6 +1344,7 @@ class HabitCorrelationViewSet(viewsets.ReadOnlyModelViewSet):
 
     serializer_class = HabitCorrelationSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = CorrelationPagination
 
     def get_queryset(self):
         """Return correlations for the current user only."""
@@ -721,6 +1354,7 @@ class HabitCorrelationViewSet(viewsets.ReadOnlyModelViewSet):
             .order_by("-max_correlation")
         )
 
+    @cached_response("correlations.list")
     def list(self, request, *args, **kwargs):
         """
         Get top correlations for the current user.
@@ -728,11 +1362,38 @@ class HabitCorrelationViewSet(viewsets.ReadOnlyModelViewSet):
         Query Parameters:
         - limit: Number of insights to return (default: 5, max: 50)
         - min_correlation: Minimum correlation threshold (default: 0.5)
+        - page_size, cursor: Page through all insights instead of taking the
+          top `limit`; returns { next, results }
 
         Example:
         GET /api/correlations/?limit=10&min_correlation=0.6
+        GET /api/correlations/?min_correlation=0.6&page_size=20
         """
-        # Get and validate query parameters
+        limit, min_correlation = self._list_params(request)
+        queryset = self.get_queryset().filter(max_correlation__gte=min_correlation)
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(
+                self.get_serializer(page, many=True).data
+            )
+
+        # Limit queryset
+        queryset = queryset[:limit]
+
+        # Serialize
+        serializer = self.get_serializer(queryset, many=True)
+
+        return Response(
+            {
+                "insights": serializer.data,
+                "count": len(serializer.data),
+                "filters": {"min_correlation": min_correlation, "limit": limit},
+            }
+        )
+
+    def _list_params(self, request):
+        """Validate the limit and min_correlation query params of list"""
         try:
             limit = int(request.GET.get("limit", 5))
             limit = max(1, min(limit, 50))  # Clamp between 1 and 50
@@ -747,23 +1408,10 @@ class HabitCorrelationViewSet(viewsets.ReadOnlyModelViewSet):
         except ValueError:
             min_correlation = 0.5
 
-        # Filter and limit queryset
-        queryset = self.get_queryset().filter(max_correlation__gte=min_correlation)[
-            :limit
-        ]
-
-        # Serialize
-        serializer = self.get_serializer(queryset, many=True)
-
-        return Response(
-            {
-                "insights": serializer.data,
-                "count": len(serializer.data),
-                "filters": {"min_correlation": min_correlation, "limit": limit},
-            }
-        )
+        return limit, min_correlation
 
     @action(detail=False, methods=["get"])
+    @cached_response("correlations.summary")
     def summary(self, request):
         """
         Get summary statistics about correlations for the user.
@@ -830,6 +1478,7 @@ class HabitCorrelationViewSet(viewsets.ReadOnlyModelViewSet):
         )
 
     @action(detail=False, methods=["get"], url_path="for-habit/(?P<habit_id>[^/.]+)")
+    @cached_response("correlations.for_habit")
     def for_habit(self, request, habit_id=None):
         """
         Get correlations for a specific habit.
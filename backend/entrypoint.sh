@@ -15,12 +15,22 @@ python manage.py migrate --settings=app.settings.production
 echo "Collecting static files..."
 python manage.py collectstatic --noinput --settings=app.settings.production
 
-echo "Starting Gunicorn..."
+# ASYNC_ANALYTICS=True serves the ASGI application with uvicorn workers
+if [ "${ASYNC_ANALYTICS:-False}" = "True" ]; then
+  WORKER_CLASS=uvicorn.workers.UvicornWorker
+  APPLICATION=app.asgi:application
+else
+  WORKER_CLASS=sync
+  APPLICATION=app.wsgi:application
+fi
+
+echo "Starting Gunicorn ($WORKER_CLASS workers)..."
 exec gunicorn \
   --bind 0.0.0.0:8000 \
-  --workers 4 \
-  --worker-class sync \
+  --workers "${GUNICORN_WORKERS:-4}" \
+  --threads "${GUNICORN_THREADS:-1}" \
+  --worker-class "$WORKER_CLASS" \
   --timeout 120 \
   --access-logfile - \
   --error-logfile - \
-  app.wsgi:application
+  "$APPLICATION"